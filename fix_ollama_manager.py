@@ -1,20 +1,64 @@
 import sys
 import os
-import subprocess
 import io
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QListWidget, 
-                             QListWidgetItem, QSplitter, QTextEdit, QMessageBox, 
+                             QListWidgetItem, QListView, QSplitter, QPlainTextEdit, QMessageBox, 
                              QInputDialog, QMenu, QStatusBar, QTabWidget, 
-                             QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog,
-                             QCheckBox)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
+                             QTableView, QHeaderView, QFileDialog,
+                             QCheckBox, QDialog, QDialogButtonBox, QProgressBar)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QTimer, QAbstractTableModel, QModelIndex,
+                          QObject, QRunnable, QThreadPool, QProcess,
+                          QProcessEnvironment)
 from PyQt5.QtGui import QIcon, QFont, QTextCursor
 import webbrowser
-from ollama_api import OllamaAPI, ensure_utf8_encoding
+from ollama_api import OllamaAPI, ensure_utf8_encoding, has_from_directive
 import re
+import shutil
 import tempfile
 import time
+from collections import deque
+
+# 合法的模型名称：字母、数字、下划线、点和连字符（\Z 确保不接受末尾换行）
+_MODEL_NAME_RE = re.compile(r'^[a-zA-Z0-9._-]+\Z', re.ASCII)
+
+# Modelfile中的FROM行（整行）
+_FROM_RE = re.compile(r'^[ \t]*FROM[ \t]+\S.*$', re.MULTILINE | re.IGNORECASE)
+# 有效的FROM指令：基础模型名称（可带标签），不接受本地文件路径
+_VALID_FROM_RE = re.compile(r'FROM\s+[a-zA-Z0-9._-]+(?::[a-zA-Z0-9._-]+)?$')
+# FROM指令所在的整行（连同行尾换行符，不区分大小写），重建Modelfile时去掉
+# _ensure_valid_from_directive和ModelfileEditor.replace_from_line使用同一规则
+_FROM_LINE_RE = re.compile(r'^[^\S\n]*FROM[ \t][^\n]*\n?', re.MULTILINE | re.IGNORECASE)
+
+# 常驻PowerShell进程在每条脚本的输出后打印的结束标记
+_PS_SENTINEL = "__OLLAMA_MANAGER_END__"
+
+# find_ollama_path的缓存中表示"已查找过但没有找到"
+_NOT_FOUND = object()
+
+# Modelfile参数说明(富文本)
+_HELP_HTML = """
+<h3>Modelfile 常用参数说明</h3>
+
+<p><b>FROM</b> - 指定基础模型，例如：llama2, mistral, gemma</p>
+
+<p><b>PARAMETER</b> - 设置模型参数：</p>
+<ul>
+  <li><b>temperature</b> - 控制生成的随机性 (0.0-1.0)，越高越随机</li>
+  <li><b>top_p</b> - 控制生成多样性 (0.0-1.0)</li>
+  <li><b>top_k</b> - 控制每步考虑的最可能token数</li>
+  <li><b>stop</b> - 停止生成的token，如 "User:", "Human:"</li>
+  <li><b>num_ctx</b> - 模型上下文长度</li>
+</ul>
+
+<p><b>SYSTEM</b> - 系统提示，定义模型的行为和角色</p>
+
+<p><b>TEMPLATE</b> - 自定义提示模板格式</p>
+
+<p><b>ADAPTER</b> - 指定adapter文件(适用于LoRA等微调)</p>
+
+<p>更多详细说明请参考<a href='https://github.com/ollama/ollama/blob/main/docs/modelfile.md'>Ollama Modelfile官方文档</a></p>
+"""
 
 class ModelfileEditor(QWidget):
     """Modelfile编辑器组件"""
@@ -23,8 +67,9 @@ class ModelfileEditor(QWidget):
         self.layout = QVBoxLayout(self)
         
         # 编辑区域
-        self.editor = QTextEdit()
+        self.editor = QPlainTextEdit()
         self.editor.setFont(QFont("Courier", 10))
+        self.editor.setLineWrapMode(QPlainTextEdit.NoWrap)
         self.editor.setPlaceholderText("# 在此编辑Modelfile内容\n# 例如:\nFROM llama2\nPARAMETER temperature 0.7\nPARAMETER top_p 0.9\nPARAMETER stop \"User:\"\nSYSTEM 你是一个有用的AI助手。")
         
         # 工具栏
@@ -48,6 +93,9 @@ class ModelfileEditor(QWidget):
         # 初始内容
         self.original_content = ""
         
+        # 参数说明对话框，首次点击时创建
+        self._help_msg = None
+        
         # 连接信号
         self.help_button.clicked.connect(self.show_help)
         self.template_button.clicked.connect(self.insert_template)
@@ -63,7 +111,7 @@ class ModelfileEditor(QWidget):
     def set_content(self, content):
         """设置编辑器内容"""
         self.original_content = content
-        self.editor.setText(content)
+        self.editor.setPlainText(content)
     
     def get_content(self):
         """获取编辑器内容"""
@@ -71,7 +119,53 @@ class ModelfileEditor(QWidget):
     
     def reset(self):
         """重置为原始内容"""
-        self.editor.setText(self.original_content)
+        self.editor.setPlainText(self.original_content)
+    
+    def replace_from_line(self, model_name):
+        """删除所有FROM行并把FROM指令写在第一行，只修改涉及的文本块
+        
+        结果与_ensure_valid_from_directive构造的内容相同（同样按_FROM_LINE_RE匹配FROM行）。
+        第一行本身是FROM行时原地替换。整个修改在一个编辑块内完成，可以一次撤销。
+        """
+        document = self.editor.document()
+        text = self.editor.toPlainText()
+        new_from = f"FROM {model_name}"
+        
+        # FROM行所在的行号，即文本块编号
+        line_numbers = []
+        line, position = 0, 0
+        for match in _FROM_LINE_RE.finditer(text):
+            line += text.count('\n', position, match.start())
+            position = match.start()
+            line_numbers.append(line)
+        
+        replace_first = bool(line_numbers) and line_numbers[0] == 0
+        if replace_first:
+            line_numbers = line_numbers[1:]
+        
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        # 从后往前删除，前面文本块的编号不受影响
+        for number in reversed(line_numbers):
+            block = document.findBlockByNumber(number)
+            end = block.position() + block.length()
+            if not block.next().isValid():
+                # 最后一行没有换行符，只删除这一行的内容
+                end -= 1
+            cursor.setPosition(block.position())
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        
+        if replace_first:
+            # 原地替换第一行；它是唯一的一行时补上换行符
+            block = document.firstBlock()
+            cursor.setPosition(block.position())
+            cursor.setPosition(block.position() + block.length() - 1, QTextCursor.KeepAnchor)
+            cursor.insertText(new_from if block.next().isValid() else f"{new_from}\n")
+        else:
+            cursor.setPosition(0)
+            cursor.insertText(f"{new_from}\n")
+        cursor.endEditBlock()
     
     def select_base_model(self):
         """选择基础模型底座"""
@@ -109,26 +203,17 @@ class ModelfileEditor(QWidget):
         if not ok or not model_name:
             return
             
-        # 获取当前内容
+        # 替换第一条FROM指令
         current_content = self.get_content()
-        lines = current_content.strip().split('\n')
-        new_content = []
-        
-        # 添加新的FROM指令
-        from_added = False
-        for line in lines:
-            if line.strip().startswith('FROM '):
-                new_content.append(f"FROM {model_name}")
-                from_added = True
-            else:
-                new_content.append(line)
+        new_from = f"FROM {model_name}"
+        new_content, replaced = _FROM_RE.subn(lambda m: new_from, current_content, count=1)
         
         # 如果没有找到FROM行，在开头添加
-        if not from_added:
-            new_content = [f"FROM {model_name}"] + new_content
+        if not replaced:
+            new_content = f"{new_from}\n{current_content}"
             
         # 更新编辑器内容
-        self.set_content("\n".join(new_content))
+        self.set_content(new_content)
         
         QMessageBox.information(
             self,
@@ -138,33 +223,13 @@ class ModelfileEditor(QWidget):
     
     def show_help(self):
         """显示Modelfile参数说明"""
-        help_text = """
-<h3>Modelfile 常用参数说明</h3>
-
-<p><b>FROM</b> - 指定基础模型，例如：llama2, mistral, gemma</p>
-
-<p><b>PARAMETER</b> - 设置模型参数：</p>
-<ul>
-  <li><b>temperature</b> - 控制生成的随机性 (0.0-1.0)，越高越随机</li>
-  <li><b>top_p</b> - 控制生成多样性 (0.0-1.0)</li>
-  <li><b>top_k</b> - 控制每步考虑的最可能token数</li>
-  <li><b>stop</b> - 停止生成的token，如 "User:", "Human:"</li>
-  <li><b>num_ctx</b> - 模型上下文长度</li>
-</ul>
-
-<p><b>SYSTEM</b> - 系统提示，定义模型的行为和角色</p>
-
-<p><b>TEMPLATE</b> - 自定义提示模板格式</p>
-
-<p><b>ADAPTER</b> - 指定adapter文件(适用于LoRA等微调)</p>
-
-<p>更多详细说明请参考<a href='https://github.com/ollama/ollama/blob/main/docs/modelfile.md'>Ollama Modelfile官方文档</a></p>
-"""
-        msg = QMessageBox()
-        msg.setWindowTitle("Modelfile 参数说明")
-        msg.setText(help_text)
-        msg.setTextFormat(Qt.RichText)
-        msg.exec_()
+        # 说明内容固定不变，对话框只创建一次
+        if self._help_msg is None:
+            self._help_msg = QMessageBox(self)
+            self._help_msg.setWindowTitle("Modelfile 参数说明")
+            self._help_msg.setTextFormat(Qt.RichText)
+            self._help_msg.setText(_HELP_HTML)
+        self._help_msg.exec_()
     
     def insert_template(self):
         """插入Modelfile模板"""
@@ -191,7 +256,37 @@ class ModelfileEditor(QWidget):
         template = template.replace("{{system_prompt}}", system_prompt)
         
         # 设置编辑器内容
-        self.editor.setText(template)
+        self.editor.setPlainText(template)
+
+class ModelInfoModel(QAbstractTableModel):
+    """模型信息表格的数据模型，保存(属性, 值)列表"""
+    HEADERS = ("属性", "值")
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self._rows[index.row()][index.column()]
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+    
+    def set_rows(self, rows):
+        """一次性替换全部行，只触发一次模型重置"""
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
 
 class ModelDetailsWidget(QWidget):
     """模型详情显示组件"""
@@ -200,9 +295,9 @@ class ModelDetailsWidget(QWidget):
         self.layout = QVBoxLayout(self)
         
         # 创建表格来显示模型信息
-        self.details_table = QTableWidget()
-        self.details_table.setColumnCount(2)
-        self.details_table.setHorizontalHeaderLabels(["属性", "值"])
+        self.details_table = QTableView()
+        self._model = ModelInfoModel(self)
+        self.details_table.setModel(self._model)
         self.details_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         
         # 创建选项卡
@@ -227,112 +322,179 @@ class ModelDetailsWidget(QWidget):
     
     def display_model_info(self, model_info):
         """显示模型信息"""
-        self.details_table.setRowCount(0)
-        
         if not model_info:
+            self._model.set_rows([])
             return
         
-        # 添加基本信息
-        self._add_table_row("名称", model_info.get("name", ""))
-        self._add_table_row("大小", f"{model_info.get('size', 0) / 1024 / 1024 / 1024:.2f} GB")
-        self._add_table_row("修改时间", model_info.get("modified", ""))
-        
-        # 添加其他可用信息
-        for key, value in model_info.items():
-            if key not in ["name", "size", "modified", "modelfile"]:
-                if isinstance(value, (dict, list)):
-                    self._add_table_row(key, str(value))
-                else:
-                    self._add_table_row(key, str(value))
-        
+        # 基本信息 + 其他可用信息，先在Python中构建完整列表再一次性交给模型
+        rows = [
+            ("名称", model_info.get("name", "")),
+            ("大小", f"{model_info.get('size', 0) / 1024 / 1024 / 1024:.2f} GB"),
+            ("修改时间", model_info.get("modified", "")),
+        ] + [
+            (key, str(value)) for key, value in model_info.items()
+            if key not in ["name", "size", "modified", "modelfile"]
+        ]
+
+        # 批量更新期间暂停重绘和排序，填充完成后只调整一次列宽
+        self.details_table.setUpdatesEnabled(False)
+        self.details_table.setSortingEnabled(False)
+        try:
+            self._model.set_rows(rows)
+            self.details_table.resizeColumnToContents(0)
+        finally:
+            self.details_table.setUpdatesEnabled(True)
+
         # 设置Modelfile内容
         if "modelfile" in model_info:
             self.modelfile_editor.set_content(model_info["modelfile"])
-    
-    def _add_table_row(self, key, value):
-        """向表格添加一行"""
-        row = self.details_table.rowCount()
-        self.details_table.insertRow(row)
-        self.details_table.setItem(row, 0, QTableWidgetItem(key))
-        self.details_table.setItem(row, 1, QTableWidgetItem(value))
 
-class CreateModelThread(QThread):
-    """创建模型的线程，避免界面卡死"""
-    # 定义信号
+class CreateModelSignals(QObject):
+    """CreateModelJob的信号载体（QRunnable本身不能发射信号）"""
     finished = pyqtSignal(bool, str, str)  # 成功/失败, 模型名称, 错误信息
-    progress = pyqtSignal(str)  # 进度消息
-    
+    progress = pyqtSignal(str, str)  # 模型名称, 进度消息
+
+class CreateModelJob(QRunnable):
+    """在全局线程池中创建模型，避免界面卡死，也不必为每次创建新建线程"""
     def __init__(self, api, model_name, modelfile_content):
         super().__init__()
         self.api = api
         self.model_name = model_name
         # 确保modelfile_content是UTF-8编码
+        # 编码规范化只在这里做一次，调用方和run()都不再重复处理
         self.modelfile_content = ensure_utf8_encoding(modelfile_content)
+        self.signals = CreateModelSignals()
     
     def run(self):
         """执行模型创建"""
+        signals = self.signals
         try:
             # 发送进度
-            self.progress.emit(f"正在创建模型 {self.model_name}...")
-            
-            # 重新确保UTF-8编码
-            modelfile_content = ensure_utf8_encoding(self.modelfile_content)
+            signals.progress.emit(self.model_name, f"正在创建模型 {self.model_name}...")
             
-            # 验证Modelfile内容 - 使用更宽松的检查，允许前导空白和注释
-            has_from = False
-            for line in modelfile_content.strip().split('\n'):
-                line = line.strip()
-                if line.startswith('#'):  # 跳过注释
-                    continue
-                if line.startswith('FROM '):
-                    has_from = True
-                    break
-                if line:  # 如果遇到非空非注释行但不是FROM，则无效
-                    break
-                    
-            if not has_from:
-                self.finished.emit(False, self.model_name, "Modelfile内容无效，必须包含FROM指令")
-                return
-                
-            # 创建模型
-            success = self.api.create_model(self.model_name, modelfile_content)
+            # 创建模型（FROM指令已由_create_model_with_thread验证，create_model也会再检查）
+            success = self.api.create_model(self.model_name, self.modelfile_content)
             
             # 验证模型是否创建成功且可用
             if success:
-                self.progress.emit(f"正在验证模型 {self.model_name}...")
+                signals.progress.emit(self.model_name, f"正在验证模型 {self.model_name}...")
                 # 这里添加额外验证...
                 
             # 发送结果
             if success:
-                self.finished.emit(True, self.model_name, "")
+                signals.finished.emit(True, self.model_name, "")
             else:
-                self.finished.emit(False, self.model_name, "模型创建失败，请检查日志")
+                signals.finished.emit(False, self.model_name, "模型创建失败，请检查日志")
         except Exception as e:
-            error_msg = f"创建模型线程出错: {e}"
+            error_msg = f"创建模型任务出错: {e}"
             print(error_msg)
-            self.finished.emit(False, self.model_name, error_msg)
+            signals.finished.emit(False, self.model_name, error_msg)
+
+class PullWorker(QThread):
+    """下载模型的线程，通过信号报告进度，可以用requestInterruption()取消"""
+    progress = pyqtSignal('qint64', 'qint64', str)  # 已完成字节, 总字节, 状态
+    finished_ok = pyqtSignal(bool)  # 是否下载成功
+    
+    def __init__(self, api, model_name):
+        super().__init__()
+        self.api = api
+        self.model_name = model_name
+        # 用户是否取消了下载（线程结束后isInterruptionRequested()总是返回False）
+        self.cancelled = False
+    
+    def run(self):
+        """执行下载"""
+        success = self.api.pull_model(
+            self.model_name,
+            progress_callback=lambda completed, total, status: self.progress.emit(
+                completed or 0, total or 0, status or ""),
+            should_stop=self.isInterruptionRequested
+        )
+        self.finished_ok.emit(success)
+
+class ApiCallSignals(QObject):
+    """ApiCall的信号载体（QRunnable本身不能发射信号）"""
+    done = pyqtSignal(object)  # API调用结果
+
+class ApiCall(QRunnable):
+    """在线程池中执行一次阻塞的API调用，结果通过信号回到界面线程"""
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = ApiCallSignals()
+    
+    def run(self):
+        """执行API调用"""
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            print(f"API调用出错: {e}")
+            result = None
+        self.signals.done.emit(result)
 
 class OllamaManagerGUI(QMainWindow):
     """Ollama模型管理器主窗口"""
     def __init__(self):
         super().__init__()
         self.api = OllamaAPI()
+        
+        # 后台API调用: 进行中的信号对象(防止被回收)和各类请求的最新编号
+        self._api_calls = set()
+        self._request_ids = {}
+        
+        # 列表中当前显示的模型: 名称 -> 模型数据，用于增量更新列表
+        self._last_model_keys = {}
+        # 后台预取的模型详细信息: 名称 -> /api/show的结果，选择模型时可以直接显示
+        self._model_info_cache = {}
+        
         self.setup_ui()
         
-        # 初始化后检查连接并加载模型
-        QTimer.singleShot(100, self.check_connection)
+        # 窗口显示后再在后台检查连接并加载模型，首屏不等待网络请求
+        QTimer.singleShot(0, self._check_connection_async)
         
         # 当前正在进行的操作
         self.current_operation = None
-        self.create_thread = None
+        # 正在创建的模型: 名称 -> 进度对话框，同名模型不允许重复提交
+        self._create_jobs = {}
+        self._preview_dialog = None  # Modelfile预览对话框，首次使用时创建
         self.model_backups = {}  # 存储模型备份信息
+        self._pull_worker = None  # 正在进行的模型下载
+        self._pending_pull = None  # 等待安全模式关闭后再开始下载的模型名称
+        self._processes = set()  # 正在运行的QProcess，完成前保持引用
+        # 常驻的PowerShell进程，用于反复执行的查询，避免每次都重新启动PowerShell
+        self._ps = None
+        self._ps_queue = deque()  # 等待结果的回调，按脚本提交顺序排列
+        self._ps_buffer = ""  # 尚未遇到结束标记的输出
         
         # 防火墙规则名称
         self.firewall_rule_name_out = "OllamaSecurityOut"
         self.firewall_rule_name_in = "OllamaSecurityIn"
         
-        # 检查防火墙规则状态
-        self.check_firewall_rules()
+        # Ollama路径在运行期间不会变化，防火墙状态只在用户切换安全模式时变化，都只查询一次
+        self._ollama_path_cache = None
+        self._security_mode_cached = None  # None表示未知，需要重新查询
+        
+        # 检查防火墙规则状态（窗口显示后在后台进行）
+        QTimer.singleShot(0, self.check_firewall_rules)
+    
+    def closeEvent(self, event):
+        """关闭窗口时取消并等待正在进行的下载，结束常驻的PowerShell进程"""
+        # 下载线程每收到一条进度记录都会检查是否被取消，很快就会结束
+        if self._pull_worker and self._pull_worker.isRunning():
+            self._pull_worker.cancelled = True
+            self._pull_worker.requestInterruption()
+            self._pull_worker.wait()
+        if self._ps is not None:
+            ps, self._ps = self._ps, None
+            # waitForFinished会同步发出readyRead，先断开输出信号，再让等待中的脚本失败
+            ps.readyReadStandardOutput.disconnect()
+            while self._ps_queue:
+                self._ps_queue.popleft()(-1, "", "窗口已关闭")
+            ps.closeWriteChannel()
+            if not ps.waitForFinished(1000):
+                ps.kill()
+        super().closeEvent(event)
     
     def setup_ui(self):
         """设置用户界面"""
@@ -371,11 +533,27 @@ class OllamaManagerGUI(QMainWindow):
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         
+        # 下载进度条和取消按钮，只在下载时显示
+        self.pull_progress_bar = QProgressBar()
+        self.pull_progress_bar.setMaximumWidth(200)
+        self.pull_progress_bar.hide()
+        self.statusBar.addPermanentWidget(self.pull_progress_bar)
+        self.pull_cancel_button = QPushButton("取消下载")
+        self.pull_cancel_button.clicked.connect(self.cancel_pull)
+        self.pull_cancel_button.hide()
+        self.statusBar.addPermanentWidget(self.pull_cancel_button)
+        
         # 创建拆分器
         splitter = QSplitter(Qt.Horizontal)
         
         # 左侧模型列表
         self.model_list = QListWidget()
+        # 所有行等高，视图无需逐项测量尺寸；分批布局避免模型很多时一次性排版
+        self.model_list.setUniformItemSizes(True)
+        self.model_list.setLayoutMode(QListView.Batched)
+        self.model_list.setBatchSize(100)
+        # 过长的模型名称直接省略显示，不再根据内容宽度重新计算水平滚动范围
+        self.model_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         splitter.addWidget(self.model_list)
         
         # 右侧详情区域
@@ -393,12 +571,21 @@ class OllamaManagerGUI(QMainWindow):
         main_layout.addWidget(splitter)
         
         # 连接信号和槽
-        self.refresh_button.clicked.connect(self.refresh_models)
+        self.refresh_button.clicked.connect(lambda: self.refresh_models(force=True))
         self.add_model_button.clicked.connect(self.create_new_model)
         self.pull_model_button.clicked.connect(self.pull_model)
         self.delete_model_button.clicked.connect(self.delete_selected_model)
         self.start_ollama_button.clicked.connect(self.start_ollama_service)
-        self.model_list.itemClicked.connect(self.show_model_details)
+        
+        # 连续点击或用方向键切换模型时合并请求，只加载最后停留的模型
+        self._pending_model = None
+        self._detail_timer = QTimer(self)
+        self._detail_timer.setSingleShot(True)
+        self._detail_timer.setInterval(150)
+        self._detail_timer.timeout.connect(self._do_show_details)
+        self.model_list.itemClicked.connect(self._schedule_model_details)
+        self.model_list.currentItemChanged.connect(
+            lambda current, previous: self._schedule_model_details(current))
         self.model_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.model_list.customContextMenuRequested.connect(self.show_context_menu)
         
@@ -410,45 +597,307 @@ class OllamaManagerGUI(QMainWindow):
         # 添加恢复按钮
         self.restore_model_button.clicked.connect(self.restore_model)
     
-    def check_connection(self):
-        """检查与Ollama API的连接"""
-        if self.api.check_connection():
+    def _check_connection_async(self):
+        """在后台检查与Ollama API的连接，不阻塞界面"""
+        self.statusBar.showMessage("正在连接Ollama服务...")
+        self._run_api_call("connection", self.api.check_connection, on_done=self._on_connection_checked)
+    
+    def _on_connection_checked(self, connected):
+        """连接检查完成后的回调（在界面线程执行）"""
+        if connected:
             self.statusBar.showMessage("已连接到Ollama服务")
             self.refresh_models()
             self.start_ollama_button.setEnabled(False)  # 已连接时禁用启动按钮
         else:
             self.statusBar.showMessage("无法连接到Ollama服务", 5000)
             self.start_ollama_button.setEnabled(True)  # 未连接时启用启动按钮
-            QMessageBox.warning(
-                self, 
+            self._info_async(
                 "连接错误", 
-                "无法连接到Ollama服务。请确保Ollama已安装并正在运行，或点击\"启动Ollama服务\"按钮。"
+                "无法连接到Ollama服务。请确保Ollama已安装并正在运行，或点击\"启动Ollama服务\"按钮。",
+                icon=QMessageBox.Warning
             )
     
-    def refresh_models(self):
-        """刷新模型列表"""
-        self.model_list.clear()
-        models = self.api.list_models()
+    def _run_api_call(self, key, fn, *args, on_done=None):
+        """在线程池中执行API调用，完成后在界面线程调用on_done(result)
+        
+        参数:
+            key: 请求类别，同一类别只保留最新一次请求的结果，过期的结果直接丢弃
+            fn: 要执行的API方法
+            on_done: 结果回调
+        """
+        request_id = self._request_ids.get(key, 0) + 1
+        self._request_ids[key] = request_id
+        
+        call = ApiCall(fn, *args)
+        signals = call.signals
+        self._api_calls.add(signals)
+        
+        def finish(result):
+            self._api_calls.discard(signals)
+            if self._request_ids.get(key) == request_id and on_done:
+                on_done(result)
+        
+        signals.done.connect(finish)
+        QThreadPool.globalInstance().start(call)
+    
+    def _info_async(self, title, text, then=None, icon=QMessageBox.Information):
+        """非阻塞地显示提示框（open()而不是exec_()，不进入嵌套事件循环）
+        
+        参数:
+            then: 可选，提示框关闭后调用
+            icon: 图标，默认为信息图标
+        """
+        message_box = QMessageBox(icon, title, text, QMessageBox.Ok, self)
+        message_box.setAttribute(Qt.WA_DeleteOnClose)
+        if then:
+            message_box.finished.connect(lambda _: then())
+        message_box.open()
+    
+    def _run_async(self, program, args, on_done, env=None):
+        """用QProcess异步执行外部命令，完成后在界面线程调用on_done(returncode, stdout, stderr)
+        
+        命令无法启动时returncode为-1，stderr为错误描述。
+        env为额外的环境变量（字典），会添加到子进程的环境中。
+        """
+        proc = QProcess(self)
+        self._processes.add(proc)
+        if env:
+            environment = QProcessEnvironment.systemEnvironment()
+            for key, value in env.items():
+                environment.insert(key, value)
+            proc.setProcessEnvironment(environment)
+        
+        def finish(returncode, stdout, stderr):
+            if proc not in self._processes:
+                return  # 已经回调过（启动失败后Qt仍可能发出finished）
+            self._processes.discard(proc)
+            proc.deleteLater()
+            on_done(returncode, stdout, stderr)
+        
+        def on_finished(exit_code, exit_status):
+            stdout = bytes(proc.readAllStandardOutput()).decode('utf-8', errors='replace')
+            stderr = bytes(proc.readAllStandardError()).decode('utf-8', errors='replace')
+            if exit_status != QProcess.NormalExit:
+                exit_code = exit_code or -1
+            finish(exit_code, stdout, stderr)
+        
+        def on_error(error):
+            if error == QProcess.FailedToStart:
+                finish(-1, "", proc.errorString())
+        
+        proc.finished.connect(on_finished)
+        proc.errorOccurred.connect(on_error)
+        proc.start(program, args)
+    
+    def _run_powershell(self, script, on_done, env=None):
+        """异步执行一段PowerShell脚本，跳过用户配置文件加载以减少启动时间
+        
+        脚本中用到的名称、路径等参数通过env传入，在脚本里用$env:名称引用，
+        参数值不会被PowerShell当作代码解析，包含引号等字符也不会破坏脚本。
+        """
+        self._run_async("powershell", ["-NoProfile", "-NonInteractive", "-Command", script], on_done, env)
+    
+    def _start_ps(self):
+        """启动常驻的PowerShell进程，从标准输入逐行读取并执行脚本"""
+        ps = QProcess(self)
+        environment = QProcessEnvironment.systemEnvironment()
+        for key, value in self._firewall_env().items():
+            environment.insert(key, value)
+        ps.setProcessEnvironment(environment)
+        # 只解析标准输出，错误输出直接丢弃，避免缓冲区写满
+        ps.setStandardErrorFile(QProcess.nullDevice())
+        ps.readyReadStandardOutput.connect(lambda: self._on_ps_output(ps))
+        ps.errorOccurred.connect(lambda error: self._on_ps_stopped(ps))
+        ps.finished.connect(lambda *args: self._on_ps_stopped(ps))
+        ps.start("powershell", ["-NoProfile", "-NonInteractive", "-Command", "-"])
+        self._ps = ps
+        self._ps_buffer = ""
+    
+    def _ps_run(self, script, on_done):
+        """在常驻的PowerShell进程中执行一行脚本，完成后调用on_done(returncode, stdout, stderr)
+        
+        脚本按提交顺序依次执行；环境变量在进程启动时设置（见_firewall_env）。
+        """
+        if self._ps is None:
+            self._start_ps()
+        self._ps_queue.append(on_done)
+        # 脚本执行完后输出结束标记，据此把输出分给对应的回调
+        self._ps.write(f"{script}; '{_PS_SENTINEL}'\n".encode('utf-8'))
+    
+    def _on_ps_output(self, ps):
+        """读取常驻PowerShell进程的输出，每遇到一个结束标记就完成一条脚本"""
+        if ps is not self._ps:
+            return
+        self._ps_buffer += bytes(ps.readAllStandardOutput()).decode('utf-8', errors='replace')
+        while self._ps_queue:
+            index = self._ps_buffer.find(_PS_SENTINEL)
+            line_end = self._ps_buffer.find('\n', index)
+            if index < 0 or line_end < 0:
+                break
+            output = self._ps_buffer[:index]
+            self._ps_buffer = self._ps_buffer[line_end + 1:]
+            self._ps_queue.popleft()(0, output, "")
+    
+    def _on_ps_stopped(self, ps):
+        """常驻PowerShell进程启动失败或退出：让等待中的脚本失败，下次使用时重新启动"""
+        if ps is not self._ps:
+            return
+        self._ps = None
+        ps.deleteLater()
+        error = ps.errorString()
+        while self._ps_queue:
+            self._ps_queue.popleft()(-1, "", error)
+    
+    def _firewall_env(self, **extra):
+        """防火墙脚本使用的环境变量：两条规则的名称，以及额外的参数"""
+        return {"FW_RULE_OUT": self.firewall_rule_name_out,
+                "FW_RULE_IN": self.firewall_rule_name_in, **extra}
+    
+    def refresh_models(self, force=False, select_name=None):
+        """刷新模型列表
+        
+        参数:
+            force: 为True时忽略缓存，重新从Ollama获取
+            select_name: 加载完成后要选中并显示详情的模型名称
+        """
+        if force:
+            self.api.invalidate_cache()
+            self._model_info_cache.clear()
+        
+        self.statusBar.showMessage("正在加载模型列表...")
+        self._run_api_call(
+            "models", self.api.list_models,
+            on_done=lambda models: self._on_models_loaded(models, select_name)
+        )
+    
+    def _on_models_loaded(self, models, select_name=None):
+        """模型列表加载完成后增量更新列表，只处理新增、删除和变化的模型，顺序与服务器返回的一致"""
+        old_models = self._last_model_keys
+        new_models = {model.get("name", "未知"): model for model in (models or [])}
+        current_item = self.model_list.currentItem()
+        current_name = current_item.text() if current_item else None
+        
+        # 批量更新期间暂停重绘和信号，更新完成后只刷新一次
+        self.model_list.setUpdatesEnabled(False)
+        self.model_list.blockSignals(True)
+        try:
+            # 移除已不存在的模型
+            for name in old_models.keys() - new_models.keys():
+                self._model_info_cache.pop(name, None)
+                for item in self.model_list.findItems(name, Qt.MatchExactly):
+                    self.model_list.takeItem(self.model_list.row(item))
+            
+            items = {self.model_list.item(row).text(): self.model_list.item(row)
+                     for row in range(self.model_list.count())}
+            for row, (name, model) in enumerate(new_models.items()):
+                item = items.get(name)
+                if item is None:
+                    # 新增的模型，插入到服务器返回的位置
+                    item = QListWidgetItem(name)
+                    item.setData(Qt.UserRole, model)
+                    self.model_list.insertItem(row, item)
+                    continue
+                if old_models.get(name) != model:
+                    # 模型有变化（如大小、修改时间），只更新数据，预取的详细信息已过期
+                    self._model_info_cache.pop(name, None)
+                    item.setData(Qt.UserRole, model)
+                if self.model_list.row(item) != row:
+                    # 服务器上的顺序变了，把已有条目移到对应位置
+                    self.model_list.insertItem(row, self.model_list.takeItem(self.model_list.row(item)))
+            
+            # 移动条目可能丢失当前选择，恢复到原来的模型
+            if current_name in new_models:
+                self.model_list.setCurrentItem(items[current_name])
+        finally:
+            self.model_list.blockSignals(False)
+            self.model_list.setUpdatesEnabled(True)
+        
+        if current_name is not None and current_name not in new_models:
+            # 当前显示的模型已被删除：清空详情，并让尚未完成的加载作废
+            self._clear_model_details()
+        elif self._pending_model is not None and self._pending_model not in new_models:
+            self._detail_timer.stop()
+            self._pending_model = None
+        
+        self._last_model_keys = new_models
         
         if not models:
             self.statusBar.showMessage("未找到模型或无法连接到Ollama")
             return
         
-        for model in models:
-            item = QListWidgetItem(model.get("name", "未知"))
-            item.setData(Qt.UserRole, model)
-            self.model_list.addItem(item)
-        
         self.statusBar.showMessage(f"已加载 {len(models)} 个模型")
+        
+        # 在后台一次性并行预取还没有缓存的模型详细信息
+        missing = [name for name in new_models if name not in self._model_info_cache]
+        if missing:
+            self._run_api_call("prefetch", self.api.get_model_infos, missing,
+                               on_done=self._on_model_infos_prefetched)
+        
+        # 选择指定的模型
+        if select_name:
+            for i in range(self.model_list.count()):
+                if self.model_list.item(i).text() == select_name:
+                    self.model_list.setCurrentRow(i)
+                    self.show_model_details(self.model_list.item(i))
+                    break
+    
+    def _clear_model_details(self):
+        """清空详情面板，并取消还未显示的详情加载"""
+        self._detail_timer.stop()
+        self._pending_model = None
+        self._request_ids["details"] = self._request_ids.get("details", 0) + 1
+        self.model_list.setCurrentItem(None)
+        self.details_widget.display_model_info(None)
+        self.details_widget.modelfile_editor.set_content("")
+    
+    def _on_model_infos_prefetched(self, infos):
+        """保存预取到的模型详细信息，只保留仍在列表中的模型"""
+        for name, info in (infos or {}).items():
+            if info and name in self._last_model_keys:
+                self._model_info_cache[name] = info
+    
+    def _schedule_model_details(self, item):
+        """延迟加载模型详情，短时间内的多次选择只触发一次加载"""
+        if item is None:
+            return
+        self._pending_model = item.text()
+        self._detail_timer.start()
+    
+    def _do_show_details(self):
+        """加载最后一次选择的模型详情"""
+        model_name, self._pending_model = self._pending_model, None
+        if model_name:
+            self._load_model_details(model_name)
     
     def show_model_details(self, item):
         """显示选中模型的详细信息"""
-        model_name = item.text()
+        # 直接加载时取消尚未触发的延迟加载
+        self._detail_timer.stop()
+        self._pending_model = None
+        self._load_model_details(item.text())
+    
+    def _load_model_details(self, model_name):
+        """在后台获取并显示模型的详细信息"""
+        cached = self._model_info_cache.get(model_name)
+        if cached:
+            # 已经预取过，直接显示；同时让还在进行中的单个加载结果作废
+            self._request_ids["details"] = self._request_ids.get("details", 0) + 1
+            self._on_model_info_loaded(model_name, cached)
+            return
+        
         self.statusBar.showMessage(f"加载模型 {model_name} 的详细信息...")
         
-        # 获取详细信息
-        model_info = self.api.get_model_info(model_name)
+        # 在后台获取详细信息
+        self._run_api_call(
+            "details", self.api.get_model_info, model_name,
+            on_done=lambda model_info: self._on_model_info_loaded(model_name, model_info)
+        )
+    
+    def _on_model_info_loaded(self, model_name, model_info):
+        """模型详细信息加载完成后显示"""
         if model_info:
+            if model_name in self._last_model_keys:
+                self._model_info_cache[model_name] = model_info
             self.details_widget.display_model_info(model_info)
             self.statusBar.showMessage(f"已加载模型 {model_name} 的详细信息")
         else:
@@ -519,13 +968,15 @@ class OllamaManagerGUI(QMainWindow):
         modelfile_content = self.details_widget.modelfile_editor.get_content()
         
         # 验证和修复Modelfile内容
-        fixed_content = self._ensure_valid_from_directive(modelfile_content)
-        if not fixed_content:
+        result = self._ensure_valid_from_directive(modelfile_content)
+        if not result:
             return  # 用户取消了操作
+        fixed_content, chosen_model = result
         
-        # 如果内容有变化，更新编辑器
-        if fixed_content != modelfile_content:
-            self.details_widget.modelfile_editor.set_content(fixed_content)
+        # 如果用户选择了基础模型，更新编辑器
+        if chosen_model:
+            # 只修改FROM行，编辑器内容与fixed_content一致
+            self.details_widget.modelfile_editor.replace_from_line(chosen_model)
             modelfile_content = fixed_content
             QMessageBox.information(
                 self,
@@ -544,7 +995,7 @@ class OllamaManagerGUI(QMainWindow):
             return
         
         # 验证模型名称合法性
-        if not re.match(r'^[a-zA-Z0-9._-]+$', model_name):
+        if not _MODEL_NAME_RE.match(model_name):
             QMessageBox.warning(
                 self, 
                 "无效的模型名称", 
@@ -564,19 +1015,23 @@ class OllamaManagerGUI(QMainWindow):
         if reply == QMessageBox.No:
             return
         
-        # 创建模型（使用线程）
-        self._create_model_with_thread(model_name, modelfile_content)
+        # 创建模型（使用线程），内容已经验证过
+        self._create_model_with_thread(model_name, modelfile_content, validated=True)
     
-    def _create_model_with_thread(self, model_name, modelfile_content):
-        """使用线程创建模型，避免界面卡死"""
-        # 检查是否正在创建模型
-        if self.create_thread and self.create_thread.isRunning():
-            QMessageBox.warning(self, "正在进行中", "正在创建另一个模型，请等待完成")
+    def _create_model_with_thread(self, model_name, modelfile_content, validated=False):
+        """使用线程创建模型，避免界面卡死
+        
+        参数:
+            validated: 调用方已用_ensure_valid_from_directive验证过modelfile_content时为True，不再重复验证
+        """
+        # 同名模型正在创建时拒绝重复提交，不同模型可以并行创建
+        if model_name in self._create_jobs:
+            QMessageBox.warning(self, "正在进行中", f"模型 {model_name} 正在创建中，请等待完成")
             return
             
         # 只在创建新模型时验证模型名称合法性
         # 当current_operation为'save'时，表示修改现有模型，跳过名称验证
-        if self.current_operation != "save" and (not model_name or not re.match(r'^[a-zA-Z0-9._-]+$', model_name)):
+        if self.current_operation != "save" and (not model_name or not _MODEL_NAME_RE.match(model_name)):
             QMessageBox.warning(
                 self, 
                 "无效的模型名称", 
@@ -584,26 +1039,23 @@ class OllamaManagerGUI(QMainWindow):
             )
             return
         
-        # 验证Modelfile内容
-        # 当current_operation为'save'时，表示修改现有模型，跳过FROM指令验证
-        # 因为在save_modelfile方法中已经处理过了
-        if self.current_operation != "save":
-            # 创建新模型时，提供选择并可能修改内容
-            fixed_content = self._ensure_valid_from_directive(modelfile_content)
-            if not fixed_content:
+        # 验证Modelfile内容，必要时让用户选择基础模型
+        if not validated:
+            result = self._ensure_valid_from_directive(modelfile_content)
+            if not result:
                 return  # If user canceled, abort
-            modelfile_content = fixed_content
+            modelfile_content = result[0]
         
         # 显示等待对话框
-        self.progress_dialog = QMessageBox(self)
-        self.progress_dialog.setWindowTitle("创建中")
-        self.progress_dialog.setText(f"正在创建模型 {model_name}，这可能需要一些时间...\n请耐心等待。")
-        self.progress_dialog.setStandardButtons(QMessageBox.Cancel)
-        self.progress_dialog.setDefaultButton(QMessageBox.Cancel)
+        progress_dialog = QMessageBox(self)
+        progress_dialog.setWindowTitle("创建中")
+        progress_dialog.setText(f"正在创建模型 {model_name}，这可能需要一些时间...\n请耐心等待。")
+        progress_dialog.setStandardButtons(QMessageBox.Cancel)
+        progress_dialog.setDefaultButton(QMessageBox.Cancel)
         
         # 处理取消按钮
         def handle_cancel():
-            if self.create_thread and self.create_thread.isRunning():
+            if model_name in self._create_jobs:
                 reply = QMessageBox.question(
                     self, 
                     "确认取消", 
@@ -613,52 +1065,56 @@ class OllamaManagerGUI(QMainWindow):
                 )
                 if reply == QMessageBox.Yes:
                     # 这里无法真正终止创建过程，只是关闭对话框
-                    self.progress_dialog.close()
+                    progress_dialog.close()
         
         # 连接取消按钮
-        cancel_button = self.progress_dialog.button(QMessageBox.Cancel)
+        cancel_button = progress_dialog.button(QMessageBox.Cancel)
         cancel_button.clicked.disconnect()
         cancel_button.clicked.connect(handle_cancel)
         
-        # 创建线程
-        # 确保传入的modelfile_content是UTF-8编码
-        modelfile_content = ensure_utf8_encoding(modelfile_content)
-        self.create_thread = CreateModelThread(self.api, model_name, modelfile_content)
+        # 创建任务（UTF-8编码规范化在CreateModelJob构造时完成）
+        job = CreateModelJob(self.api, model_name, modelfile_content)
+        # 信号对象由_create_jobs间接持有，任务结束前不会被回收
+        progress_dialog.signals = job.signals
+        self._create_jobs[model_name] = progress_dialog
         
         # 连接信号
-        self.create_thread.finished.connect(self._on_model_created)
-        self.create_thread.progress.connect(self._update_progress)
+        job.signals.finished.connect(self._on_model_created)
+        job.signals.progress.connect(self._update_progress)
         
-        # 启动线程
-        self.create_thread.start()
+        # 提交到全局线程池，复用已有的工作线程
+        QThreadPool.globalInstance().start(job)
         
         # 显示进度对话框（非模态）
-        self.progress_dialog.setModal(False)
-        self.progress_dialog.show()
+        progress_dialog.setModal(False)
+        progress_dialog.show()
         
         # 更新状态栏
         self.statusBar.showMessage(f"正在创建模型 {model_name}...")
     
-    def _update_progress(self, message):
+    def _update_progress(self, model_name, message):
         """更新进度信息"""
-        if hasattr(self, 'progress_dialog') and self.progress_dialog:
-            self.progress_dialog.setText(message)
+        progress_dialog = self._create_jobs.get(model_name)
+        if progress_dialog:
+            progress_dialog.setText(message)
         self.statusBar.showMessage(message)
     
     def _on_model_created(self, success, model_name, error_msg=""):
         """模型创建完成后的回调"""
         # 关闭进度对话框
-        if hasattr(self, 'progress_dialog') and self.progress_dialog:
-            self.progress_dialog.close()
-            self.progress_dialog = None
+        progress_dialog = self._create_jobs.pop(model_name, None)
+        if progress_dialog:
+            progress_dialog.close()
         
         # 处理创建结果
         if success:
             self.statusBar.showMessage(f"模型 {model_name} 创建成功")
-            QMessageBox.information(self, "创建成功", f"模型 {model_name} 已成功创建")
+            self._info_async("创建成功", f"模型 {model_name} 已成功创建")
             
-            # 刷新模型列表
-            self.refresh_models()
+            # 模型已变更，清除缓存后刷新模型列表，加载完成后选择新创建的模型
+            self.api.invalidate_cache(model_name)
+            self._model_info_cache.pop(model_name, None)
+            self.refresh_models(select_name=model_name)
             
             # 恢复保存按钮的原始功能
             if self.current_operation == "create" or self.current_operation == "clone":
@@ -668,25 +1124,23 @@ class OllamaManagerGUI(QMainWindow):
                     pass
                 self.details_widget.modelfile_editor.save_button.clicked.connect(self.save_modelfile)
                 self.current_operation = None
-            
-            # 选择新创建的模型
-            for i in range(self.model_list.count()):
-                if self.model_list.item(i).text() == model_name:
-                    self.model_list.setCurrentRow(i)
-                    self.show_model_details(self.model_list.item(i))
-                    break
         else:
             error_detail = f"\n错误详情: {error_msg}" if error_msg else ""
             self.statusBar.showMessage(f"模型 {model_name} 创建失败")
-            QMessageBox.warning(
-                self, 
+            self._info_async(
                 "创建失败", 
-                f"无法创建模型 {model_name}\n请检查Modelfile格式和Ollama服务状态。{error_detail}"
+                f"无法创建模型 {model_name}\n请检查Modelfile格式和Ollama服务状态。{error_detail}",
+                icon=QMessageBox.Warning
             )
     
     def pull_model(self):
         """下载模型"""
+        # 同时只能有一个下载，在询问名称和关闭安全模式之前就检查
+        if self._pull_in_progress():
+            return
+        
         # 检查安全模式是否开启
+        disable_security = False
         if self.security_mode_checkbox.isChecked():
             reply = QMessageBox.question(
                 self,
@@ -697,29 +1151,109 @@ class OllamaManagerGUI(QMainWindow):
                 QMessageBox.No
             )
             
-            if reply == QMessageBox.Yes:
-                # 暂时关闭安全模式
-                self.security_mode_checkbox.setChecked(False)
-            else:
+            if reply != QMessageBox.Yes:
                 return
+            disable_security = True
                 
         model_name, ok = QInputDialog.getText(
             self, "下载模型", "输入要下载的模型名称 (例如: llama2, mistral):"
         )
         
-        if ok and model_name:
-            self.statusBar.showMessage(f"正在下载模型 {model_name}...")
-            
-            # 提示用户下载可能需要一段时间
-            QMessageBox.information(
-                self,
-                "下载模型",
-                f"正在开始下载模型 {model_name}，这可能需要一些时间。\n"
-                f"Ollama将在后台下载。您可以稍后刷新列表查看下载状态。"
+        if not (ok and model_name):
+            return
+        
+        if disable_security:
+            # 暂时关闭安全模式；删除防火墙规则是异步的，成功后才在_on_security_mode_disabled中开始下载
+            self._pending_pull = model_name
+            self.security_mode_checkbox.setChecked(False)
+        else:
+            self._begin_pull(model_name)
+    
+    def _pull_in_progress(self):
+        """是否已有下载正在进行或等待安全模式关闭后开始，是则提示用户"""
+        if self._pull_worker and self._pull_worker.isRunning():
+            model_name = self._pull_worker.model_name
+        elif self._pending_pull:
+            model_name = self._pending_pull
+        else:
+            return False
+        QMessageBox.warning(
+            self,
+            "正在进行中",
+            f"正在下载模型 {model_name}，请等待完成或取消后再试"
+        )
+        return True
+    
+    def _begin_pull(self, model_name):
+        """开始下载，下载线程启动后再提示用户"""
+        if not self._start_pull(model_name):
+            return
+        
+        # 提示用户下载可能需要一段时间
+        self._info_async(
+            "下载模型",
+            f"正在开始下载模型 {model_name}，这可能需要一些时间。\n"
+            f"下载进度显示在状态栏中，可以随时取消。"
+        )
+    
+    def _start_pull(self, model_name):
+        """在后台线程中下载模型，进度显示在状态栏；已有下载在进行时返回False"""
+        if self._pull_in_progress():
+            return False
+        
+        self.statusBar.showMessage(f"正在下载模型 {model_name}...")
+        self.pull_progress_bar.setRange(0, 0)  # 获得总大小前显示忙碌状态
+        self.pull_progress_bar.show()
+        self.pull_cancel_button.setEnabled(True)
+        self.pull_cancel_button.show()
+        
+        worker = PullWorker(self.api, model_name)
+        worker.progress.connect(self._on_pull_progress)
+        worker.finished_ok.connect(lambda success: self._on_pull_finished(model_name, success))
+        self._pull_worker = worker
+        worker.start()
+        return True
+    
+    def _on_pull_progress(self, completed, total, status):
+        """更新下载进度"""
+        model_name = self._pull_worker.model_name
+        if total > 0:
+            # 进度条只支持int，换算成千分比
+            self.pull_progress_bar.setRange(0, 1000)
+            self.pull_progress_bar.setValue(int(completed * 1000 / total))
+            self.statusBar.showMessage(
+                f"正在下载模型 {model_name}: {status} {completed / 1048576:.1f}/{total / 1048576:.1f} MB")
+        else:
+            self.pull_progress_bar.setRange(0, 0)
+            self.statusBar.showMessage(f"正在下载模型 {model_name}: {status}")
+    
+    def cancel_pull(self):
+        """取消正在进行的下载"""
+        if self._pull_worker and self._pull_worker.isRunning():
+            self._pull_worker.cancelled = True
+            self._pull_worker.requestInterruption()
+            self.pull_cancel_button.setEnabled(False)
+            self.statusBar.showMessage(f"正在取消下载模型 {self._pull_worker.model_name}...")
+    
+    def _on_pull_finished(self, model_name, success):
+        """下载结束后的回调"""
+        self.pull_progress_bar.hide()
+        self.pull_cancel_button.hide()
+        # 线程对象保留到下一次下载，此时run()可能还未完全返回
+        cancelled = self._pull_worker.cancelled
+        
+        if success:
+            self.statusBar.showMessage(f"模型 {model_name} 下载完成")
+            self.refresh_models(select_name=model_name)
+        elif cancelled:
+            self.statusBar.showMessage(f"已取消下载模型 {model_name}")
+        else:
+            self.statusBar.showMessage(f"下载模型 {model_name} 失败")
+            self._info_async(
+                "下载失败",
+                f"无法下载模型 {model_name}\n请检查模型名称和网络连接（安全模式会阻止下载）。",
+                icon=QMessageBox.Warning
             )
-            
-            # 使用系统命令执行下载
-            os.system(f'start cmd /k ollama pull {model_name}')
     
     def delete_selected_model(self):
         """删除选中的模型"""
@@ -743,6 +1277,8 @@ class OllamaManagerGUI(QMainWindow):
             
             if success:
                 self.statusBar.showMessage(f"模型 {model_name} 已删除")
+                # API缓存由delete_model自己清除，这里只丢弃界面预取的详细信息
+                self._model_info_cache.pop(model_name, None)
                 self.refresh_models()
             else:
                 self.statusBar.showMessage(f"删除模型 {model_name} 失败")
@@ -760,13 +1296,15 @@ class OllamaManagerGUI(QMainWindow):
         
         # 检查Modelfile内容，如果无效，提供选择基座模型
         # 这里不使用check_only=True，允许用户选择基座模型
-        fixed_content = self._ensure_valid_from_directive(modelfile_content)
-        if not fixed_content:
+        result = self._ensure_valid_from_directive(modelfile_content)
+        if not result:
             return  # 用户取消了选择
+        fixed_content, chosen_model = result
         
-        # 如果内容有变更，更新编辑器
-        if fixed_content != modelfile_content:
-            self.details_widget.modelfile_editor.set_content(fixed_content)
+        # 如果用户选择了基础模型，更新编辑器
+        if chosen_model:
+            # 只修改FROM行，编辑器内容与fixed_content一致
+            self.details_widget.modelfile_editor.replace_from_line(chosen_model)
             modelfile_content = fixed_content
             QMessageBox.information(
                 self,
@@ -775,22 +1313,17 @@ class OllamaManagerGUI(QMainWindow):
             )
         
         # 显示预览并确认
-        preview_dialog = QMessageBox(self)
-        preview_dialog.setWindowTitle("确认Modelfile内容")
-        preview_dialog.setText(f"即将更新模型 {model_name} 的Modelfile。请确认内容正确:")
-        preview_dialog.setDetailedText(modelfile_content)
-        preview_dialog.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-        preview_dialog.setDefaultButton(QMessageBox.No)
-        
-        if preview_dialog.exec_() != QMessageBox.Yes:
+        if not self._confirm_modelfile_preview(model_name, modelfile_content):
             return
         
         # 备份原始模型的Modelfile
         try:
             original_modelfile = self.api.get_modelfile(model_name)
             backup_path = os.path.join(tempfile.gettempdir(), f"{model_name}_backup.modelfile")
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                f.write(original_modelfile or "")
+            # 一次编码、一次写入整个内容
+            data = (original_modelfile or "").encode('utf-8')
+            with open(backup_path, 'wb', buffering=max(len(data), 65536)) as f:
+                f.write(data)
             
             # 保存备份信息
             self.model_backups[model_name] = {
@@ -814,8 +1347,41 @@ class OllamaManagerGUI(QMainWindow):
         if reply == QMessageBox.Yes:
             # 使用线程重构模型
             self.current_operation = "save"
-            # 直接传递更新后的内容
-            self._create_model_with_thread(model_name, modelfile_content)
+            # 直接传递更新后的内容，内容已经验证过
+            self._create_model_with_thread(model_name, modelfile_content, validated=True)
+    
+    def _confirm_modelfile_preview(self, model_name, modelfile_content):
+        """显示Modelfile预览对话框，用户确认后返回True"""
+        if self._preview_dialog is None:
+            dialog = QDialog(self)
+            dialog.setWindowTitle("确认Modelfile内容")
+            dialog.resize(600, 400)
+            layout = QVBoxLayout(dialog)
+            
+            dialog.label = QLabel()
+            dialog.preview = QPlainTextEdit()
+            dialog.preview.setReadOnly(True)
+            dialog.preview.setFont(QFont("Courier", 10))
+            dialog.preview.setLineWrapMode(QPlainTextEdit.NoWrap)
+            
+            buttons = QDialogButtonBox(QDialogButtonBox.Yes | QDialogButtonBox.No)
+            buttons.accepted.connect(dialog.accept)
+            buttons.rejected.connect(dialog.reject)
+            dialog.no_button = buttons.button(QDialogButtonBox.No)
+            
+            layout.addWidget(dialog.label)
+            layout.addWidget(dialog.preview)
+            layout.addWidget(buttons)
+            self._preview_dialog = dialog
+        
+        dialog = self._preview_dialog
+        dialog.label.setText(f"即将更新模型 {model_name} 的Modelfile。请确认内容正确:")
+        dialog.preview.setPlainText(modelfile_content)
+        # 默认选择"否"
+        dialog.no_button.setDefault(True)
+        dialog.no_button.setFocus()
+        
+        return dialog.exec_() == QDialog.Accepted
     
     def show_context_menu(self, position):
         """显示右键菜单"""
@@ -850,7 +1416,14 @@ class OllamaManagerGUI(QMainWindow):
     
     def export_modelfile(self, model_name):
         """导出Modelfile到文件"""
-        modelfile_content = self.api.get_modelfile(model_name)
+        self.statusBar.showMessage(f"正在获取模型 {model_name} 的Modelfile...")
+        self._run_api_call(
+            "export", self.api.get_modelfile, model_name,
+            on_done=lambda content: self._on_export_modelfile_loaded(model_name, content)
+        )
+    
+    def _on_export_modelfile_loaded(self, model_name, modelfile_content):
+        """获取到Modelfile后选择保存位置并写入文件"""
         if not modelfile_content:
             QMessageBox.warning(self, "导出失败", f"无法获取模型 {model_name} 的Modelfile")
             return
@@ -864,36 +1437,39 @@ class OllamaManagerGUI(QMainWindow):
         
         if file_path:
             try:
-                # 明确指定使用UTF-8编码保存文件
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modelfile_content)
+                # 明确指定使用UTF-8编码，一次编码、一次写入整个内容
+                data = modelfile_content.encode('utf-8')
+                with open(file_path, 'wb', buffering=max(len(data), 65536)) as f:
+                    f.write(data)
                 self.statusBar.showMessage(f"已将Modelfile导出到 {file_path}")
-                QMessageBox.information(self, "导出成功", f"Modelfile已成功导出到\n{file_path}")
+                self._info_async("导出成功", f"Modelfile已成功导出到\n{file_path}")
             except Exception as e:
                 self.statusBar.showMessage(f"导出失败: {e}")
-                QMessageBox.warning(self, "导出失败", f"导出Modelfile时出错:\n{e}")
+                self._info_async("导出失败", f"导出Modelfile时出错:\n{e}", icon=QMessageBox.Warning)
     
     def start_ollama_service(self):
         """启动Ollama服务"""
         self.statusBar.showMessage("尝试启动Ollama服务...")
         
         try:
-            # 使用系统命令在新窗口中启动ollama serve
+            # 在新窗口中启动ollama serve，分离进程不阻塞界面
             if sys.platform == 'win32':
-                os.system('start cmd /k ollama serve')
+                started = QProcess.startDetached("cmd", ["/k", "ollama", "serve"])
             else:
-                os.system('gnome-terminal -- bash -c "ollama serve; exec bash"')
+                started = QProcess.startDetached(
+                    "gnome-terminal", ["--", "bash", "-c", "ollama serve; exec bash"])
+            if not started:
+                raise OSError("无法启动终端窗口")
             
             # 给服务一些启动时间
-            QMessageBox.information(
-                self,
+            self._info_async(
                 "启动Ollama",
                 "正在启动Ollama服务，这可能需要几秒钟时间...\n"
                 "服务启动后，请点击'刷新'按钮重新连接。"
             )
             
             # 3秒后尝试重新连接
-            QTimer.singleShot(3000, self.check_connection)
+            QTimer.singleShot(3000, self._check_connection_async)
             
         except Exception as e:
             self.statusBar.showMessage(f"启动Ollama服务失败: {e}")
@@ -920,8 +1496,7 @@ class OllamaManagerGUI(QMainWindow):
         self.details_widget.modelfile_editor.set_content(base_modelfile)
         
         # 提示用户编辑Modelfile
-        QMessageBox.information(
-            self,
+        self._info_async(
             "编辑Modelfile",
             f"您正在基于 {base_model_name} 创建新模型。\n\n"
             f"请在编辑器中修改Modelfile内容，例如：\n"
@@ -939,27 +1514,49 @@ class OllamaManagerGUI(QMainWindow):
         )
 
     def check_firewall_rules(self):
-        """检查防火墙规则是否存在"""
-        try:
-            # 检查出站规则
-            cmd_out = f'powershell -Command "Get-NetFirewallRule -DisplayName \'{self.firewall_rule_name_out}\' -ErrorAction SilentlyContinue"'
-            result_out = subprocess.run(cmd_out, capture_output=True, text=True)
-            
-            # 检查入站规则
-            cmd_in = f'powershell -Command "Get-NetFirewallRule -DisplayName \'{self.firewall_rule_name_in}\' -ErrorAction SilentlyContinue"'
-            result_in = subprocess.run(cmd_in, capture_output=True, text=True)
-            
-            # 如果规则存在，则说明安全模式已开启
-            if result_out.returncode == 0 and result_in.returncode == 0:
-                self.security_mode_checkbox.setChecked(True)
-                self.statusBar.showMessage("安全模式已开启，Ollama无法联网")
-            else:
-                self.security_mode_checkbox.setChecked(False)
-                self.statusBar.showMessage("安全模式已关闭，Ollama可以联网")
-                
-        except Exception as e:
-            self.statusBar.showMessage(f"检查防火墙规则失败: {e}")
-            self.security_mode_checkbox.setChecked(False)
+        """检查防火墙规则是否存在（在后台执行，完成后更新安全模式复选框）"""
+        if self._security_mode_cached is not None:
+            self._on_firewall_checked((self._security_mode_cached, ""))
+            return
+        
+        # 一次PowerShell调用统计出站和入站规则的数量，只采用最新一次检查的结果
+        request_id = self._request_ids.get("firewall", 0) + 1
+        self._request_ids["firewall"] = request_id
+        
+        def done(returncode, stdout, stderr):
+            if self._request_ids.get("firewall") != request_id:
+                return
+            try:
+                count = int(stdout.strip())
+            except ValueError:
+                self._on_firewall_checked((False, stderr.strip() or f"命令返回错误码 {returncode}"))
+                return
+            # 如果两条规则都存在，则说明安全模式已开启
+            self._security_mode_cached = count >= 2
+            self._on_firewall_checked((self._security_mode_cached, ""))
+        
+        # 查询可能反复进行，交给常驻的PowerShell进程执行
+        self._ps_run(
+            "@(Get-NetFirewallRule -DisplayName $env:FW_RULE_OUT -ErrorAction SilentlyContinue).Count + "
+            "@(Get-NetFirewallRule -DisplayName $env:FW_RULE_IN -ErrorAction SilentlyContinue).Count",
+            done
+        )
+    
+    def _on_firewall_checked(self, result):
+        """防火墙规则检查完成后更新界面"""
+        enabled, error = result or (False, "未知错误")
+        
+        # 只同步复选框状态，不触发toggle_security_mode
+        self.security_mode_checkbox.blockSignals(True)
+        self.security_mode_checkbox.setChecked(enabled)
+        self.security_mode_checkbox.blockSignals(False)
+        
+        if error:
+            self.statusBar.showMessage(f"检查防火墙规则失败: {error}")
+        elif enabled:
+            self.statusBar.showMessage("安全模式已开启，Ollama无法联网")
+        else:
+            self.statusBar.showMessage("安全模式已关闭，Ollama可以联网")
     
     def toggle_security_mode(self, state):
         """切换安全模式状态"""
@@ -974,6 +1571,7 @@ class OllamaManagerGUI(QMainWindow):
                     "安全模式需要知道Ollama程序的位置才能设置防火墙规则。"
                 )
                 self.security_mode_checkbox.setChecked(False)
+                self._pending_pull = None
                 return
                 
             if state == Qt.Checked:  # 开启安全模式
@@ -987,27 +1585,31 @@ class OllamaManagerGUI(QMainWindow):
                 f"设置安全模式时出错: {e}\n" +
                 "可能需要以管理员身份运行此应用程序。"
             )
-            # 恢复复选框状态
+            self._pending_pull = None
+            # 规则状态已不确定，重新查询以恢复复选框状态
+            self._security_mode_cached = None
             self.check_firewall_rules()
     
     def find_ollama_path(self):
-        """查找Ollama可执行文件的路径"""
-        # 常见的Ollama安装路径
+        """查找Ollama可执行文件的路径（结果会被缓存）"""
+        if self._ollama_path_cache is None:
+            path = self._discover_ollama_path()
+            self._ollama_path_cache = _NOT_FOUND if path is None else path
+        return None if self._ollama_path_cache is _NOT_FOUND else self._ollama_path_cache
+    
+    def _discover_ollama_path(self):
+        """实际查找Ollama可执行文件的路径"""
+        # 先在PATH中查找（shutil.which在Windows上会按PATHEXT补全扩展名）
+        path = shutil.which("ollama")
+        if path:
+            return path
+        
+        # 检查常见的Ollama安装路径
         potential_paths = [
             os.path.expanduser("~\\AppData\\Local\\Programs\\Ollama\\ollama.exe"),
             "C:\\Program Files\\Ollama\\ollama.exe",
             "C:\\Ollama\\ollama.exe"
         ]
-        
-        # 通过where命令找到路径
-        try:
-            result = subprocess.run("where ollama", capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except:
-            pass
-            
-        # 检查潜在路径
         for path in potential_paths:
             if os.path.exists(path):
                 return path
@@ -1015,54 +1617,83 @@ class OllamaManagerGUI(QMainWindow):
         return None
     
     def enable_security_mode(self, ollama_path):
-        """启用安全模式，禁止Ollama联网"""
-        try:
+        """启用安全模式，禁止Ollama联网（一次PowerShell调用创建出站和入站规则）"""
+        self.statusBar.showMessage("正在开启安全模式...")
+        self._run_powershell(
             # 创建出站规则
-            cmd_out = (
-                f'powershell -Command "New-NetFirewallRule -DisplayName \'{self.firewall_rule_name_out}\' '
-                f'-Direction Outbound -Program \'{ollama_path}\' -Action Block '
-                f'-Description \'Block Ollama outbound connections for security\'"'
-            )
-            subprocess.run(cmd_out, check=True)
-            
+            "New-NetFirewallRule -DisplayName $env:FW_RULE_OUT "
+            "-Direction Outbound -Program $env:FW_PROGRAM -Action Block "
+            "-Description 'Block Ollama outbound connections for security' -ErrorAction Stop; "
             # 创建入站规则
-            cmd_in = (
-                f'powershell -Command "New-NetFirewallRule -DisplayName \'{self.firewall_rule_name_in}\' '
-                f'-Direction Inbound -Program \'{ollama_path}\' -Action Block -LocalPort Any -RemotePort Any '
-                f'-Description \'Block Ollama inbound connections for security\'"'
-            )
-            subprocess.run(cmd_in, check=True)
-            
-            self.statusBar.showMessage("安全模式已开启，Ollama无法联网")
-            QMessageBox.information(
-                self,
-                "安全模式已开启",
-                "已为Ollama创建防火墙规则，禁止其联网。\n" +
-                "本地对话不受影响，但无法下载新模型或访问在线资源。"
-            )
-        except Exception as e:
-            raise Exception(f"启用安全模式失败: {e}")
+            "New-NetFirewallRule -DisplayName $env:FW_RULE_IN "
+            "-Direction Inbound -Program $env:FW_PROGRAM -Action Block -LocalPort Any -RemotePort Any "
+            "-Description 'Block Ollama inbound connections for security' -ErrorAction Stop",
+            self._on_security_mode_enabled, self._firewall_env(FW_PROGRAM=ollama_path)
+        )
+    
+    def _on_security_mode_enabled(self, returncode, stdout, stderr):
+        """防火墙规则创建完成后的回调"""
+        error = self._firewall_error(returncode, stderr)
+        if error:
+            self._on_security_mode_failed(f"启用安全模式失败: {error}")
+            return
+        
+        self._security_mode_cached = True
+        self.statusBar.showMessage("安全模式已开启，Ollama无法联网")
+        self._info_async(
+            "安全模式已开启",
+            "已为Ollama创建防火墙规则，禁止其联网。\n" +
+            "本地对话不受影响，但无法下载新模型或访问在线资源。"
+        )
     
     def disable_security_mode(self):
-        """关闭安全模式，允许Ollama联网"""
-        try:
-            # 删除出站规则
-            cmd_out = f'powershell -Command "Remove-NetFirewallRule -DisplayName \'{self.firewall_rule_name_out}\' -ErrorAction SilentlyContinue"'
-            subprocess.run(cmd_out, check=True)
-            
-            # 删除入站规则
-            cmd_in = f'powershell -Command "Remove-NetFirewallRule -DisplayName \'{self.firewall_rule_name_in}\' -ErrorAction SilentlyContinue"'
-            subprocess.run(cmd_in, check=True)
-            
-            self.statusBar.showMessage("安全模式已关闭，Ollama可以联网")
-            QMessageBox.information(
-                self,
-                "安全模式已关闭",
-                "已移除Ollama的防火墙限制，现在可以联网。\n" +
-                "可以下载新模型和访问在线资源。"
-            )
-        except Exception as e:
-            raise Exception(f"关闭安全模式失败: {e}")
+        """关闭安全模式，允许Ollama联网（一次PowerShell调用删除出站和入站规则）"""
+        self.statusBar.showMessage("正在关闭安全模式...")
+        self._run_powershell(
+            "Remove-NetFirewallRule -DisplayName $env:FW_RULE_OUT -ErrorAction SilentlyContinue; "
+            "Remove-NetFirewallRule -DisplayName $env:FW_RULE_IN -ErrorAction SilentlyContinue",
+            self._on_security_mode_disabled, self._firewall_env()
+        )
+    
+    def _on_security_mode_disabled(self, returncode, stdout, stderr):
+        """防火墙规则删除完成后的回调"""
+        error = self._firewall_error(returncode, stderr)
+        if error:
+            self._on_security_mode_failed(f"关闭安全模式失败: {error}")
+            return
+        
+        self._security_mode_cached = False
+        self.statusBar.showMessage("安全模式已关闭，Ollama可以联网")
+        self._info_async(
+            "安全模式已关闭",
+            "已移除Ollama的防火墙限制，现在可以联网。\n" +
+            "可以下载新模型和访问在线资源。"
+        )
+        
+        # 为下载而关闭安全模式时，规则删除成功后才开始下载
+        if self._pending_pull:
+            model_name, self._pending_pull = self._pending_pull, None
+            self._begin_pull(model_name)
+    
+    def _firewall_error(self, returncode, stderr):
+        """从防火墙命令的结果中提取错误信息，成功时返回空字符串"""
+        if returncode != 0:
+            return stderr.strip() or f"命令返回错误码 {returncode}"
+        return ""
+    
+    def _on_security_mode_failed(self, message):
+        """防火墙规则设置失败时提示用户并恢复复选框状态"""
+        # 安全模式没有关闭，等待中的下载不再进行
+        self._pending_pull = None
+        self._info_async(
+            "操作失败",
+            f"设置安全模式时出错: {message}\n" +
+            "可能需要以管理员身份运行此应用程序。",
+            icon=QMessageBox.Warning
+        )
+        # 规则状态已不确定，重新查询以恢复复选框状态
+        self._security_mode_cached = None
+        self.check_firewall_rules()
 
     def restore_model(self):
         """恢复损坏的模型"""
@@ -1074,8 +1705,7 @@ class OllamaManagerGUI(QMainWindow):
                 model_name = current_item.text()
                 self._restore_specific_model(model_name)
             else:
-                QMessageBox.information(
-                    self,
+                self._info_async(
                     "无备份",
                     "未找到模型备份。您可以手动重新拉取模型。"
                 )
@@ -1111,10 +1741,16 @@ class OllamaManagerGUI(QMainWindow):
         backup_path = os.path.join(tempfile.gettempdir(), f"{model_name}_backup.modelfile")
         if os.path.exists(backup_path):
             try:
-                with open(backup_path, 'r', encoding='utf-8') as f:
-                    backup_content = f.read()
+                # 先只读开头判断备份是否有效，无效的备份不必整个读入
+                with open(backup_path, 'rb') as f:
+                    head = f.read(256)
+                    backup_content = None
+                    if head.lstrip().startswith(b"FROM"):
+                        # 从头按文本读取，与原来一样转换换行符
+                        f.seek(0)
+                        backup_content = io.TextIOWrapper(f, encoding='utf-8').read()
                     
-                if backup_content and backup_content.strip().startswith("FROM"):
+                if backup_content:
                     # 有可用备份，询问是否使用
                     use_backup = QMessageBox.question(
                         self,
@@ -1131,10 +1767,16 @@ class OllamaManagerGUI(QMainWindow):
             except Exception as e:
                 print(f"读取备份失败: {e}")
         
-        # 没有可用备份，尝试重新拉取
+        # 没有可用备份，先在后台删除可能损坏的模型，完成后再询问恢复方式
+        self.statusBar.showMessage(f"正在删除可能损坏的模型 {model_name}...")
+        self._run_async("ollama", ["rm", model_name],
+                        lambda *result: self._on_damaged_model_removed(model_name))
+    
+    def _on_damaged_model_removed(self, model_name):
+        """删除损坏模型后询问用户如何恢复"""
         try:
-            # 先删除可能损坏的模型
-            subprocess.run(f'ollama rm {model_name}', shell=True, capture_output=True)
+            self.api.invalidate_cache(model_name)
+            self._model_info_cache.pop(model_name, None)
             
             # 询问用户如何恢复
             options = ["重新拉取(下载)模型", "手动创建新模型", "取消"]
@@ -1152,12 +1794,11 @@ class OllamaManagerGUI(QMainWindow):
                 
             if choice == "重新拉取(下载)模型":
                 # 启动下载
-                QMessageBox.information(
-                    self,
+                self._info_async(
                     "开始下载",
-                    f"即将开始下载模型 {model_name}。\n这可能需要一些时间。"
+                    f"即将开始下载模型 {model_name}。\n这可能需要一些时间。",
+                    then=lambda: self._start_pull(model_name)
                 )
-                os.system(f'start cmd /k ollama pull {model_name}')
             else:
                 # 创建新模型
                 self.create_new_model()
@@ -1212,33 +1853,21 @@ class OllamaManagerGUI(QMainWindow):
         参数:
             modelfile_content: Modelfile内容
             check_only: 如果为True，只检查不修改内容，发现问题时返回None并警告
+        
+        返回:
+            (有效的Modelfile内容, 用户选择的基础模型)，内容无需修改时基础模型为None；
+            用户取消或内容无效时返回None
         """
         if not modelfile_content:
             return None
-            
-        # 检查是否包含有效的FROM指令
-        has_valid_from = False
-        from_line = ""
-        lines = modelfile_content.strip().split('\n')
-        
-        for line in lines:
-            if line.strip().startswith('#'):  # 跳过注释行
-                continue
-            if line.strip().startswith('FROM '):
-                from_line = line.strip()
-                # 检查FROM指令是否有效（不包含本地文件路径）
-                if not re.search(r'FROM\s+[a-zA-Z0-9._-]+(?::[a-zA-Z0-9._-]+)?$', from_line):
-                    # 无效的FROM指令
-                    break
-                else:
-                    has_valid_from = True
-                    break
-            if line.strip() and not line.strip().startswith('#'):
-                # 遇到非注释、非空行但不是FROM，说明Modelfile格式错误
-                break
         
-        if has_valid_from:
-            return modelfile_content
+        # 检查是否包含有效的FROM指令
+        # 第一个非注释、非空行决定结果：不是有效的FROM说明Modelfile格式错误
+        if has_from_directive(modelfile_content):
+            # 此时第一个FROM行就是第一个非注释行，检查FROM指令是否有效（不包含本地文件路径）
+            from_line = _FROM_LINE_RE.search(modelfile_content).group(0).strip()
+            if _VALID_FROM_RE.match(from_line):
+                return modelfile_content, None
             
         # 如果只是检查并且发现没有有效的FROM指令
         if check_only:
@@ -1278,18 +1907,9 @@ class OllamaManagerGUI(QMainWindow):
         if not ok or not model_name:
             return None
             
-        # 分离用户编辑器中的非FROM行内容（包括注释）
-        user_content = []
-        for line in lines:
-            # 跳过原来的FROM行，但保留所有其他行，包括注释和空行
-            if not line.strip().startswith('FROM '):
-                user_content.append(line)
-        
         # 构造新Modelfile：新FROM指令 + 用户编辑的其他内容
-        new_content = [f"FROM {model_name}"]
-        new_content.extend(user_content)
-        
-        return "\n".join(new_content)
+        # 跳过原来的FROM行，但保留所有其他行，包括注释和空行；直接在原字符串上切除，不拆分成行
+        return f"FROM {model_name}\n" + _FROM_LINE_RE.sub('', modelfile_content), model_name
 
 if __name__ == "__main__":
     # 确保使用UTF-8编码
@@ -5,8 +5,44 @@ import tempfile
 import sys
 import subprocess
 import re
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, RequestException, Timeout
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 缓存有效期（秒）
+MODEL_LIST_TTL = 30
+MODELFILE_TTL = 120
+CONNECTION_TTL = 0.5
+# Modelfile缓存最多保存的模型数
+MODELFILE_CACHE_SIZE = 64
+# get_model_infos并行请求的最大数量
+MODEL_INFO_WORKERS = 8
+# Windows下执行ollama命令时不弹出控制台窗口（其他系统必须为0）
+_NO_WINDOW = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+# Modelfile中第一个非空、非注释的行
+_FIRST_NONCOMMENT_RE = re.compile(r'^(?![ \t]*(?:#|$))[ \t]*(\S.*)$', re.MULTILINE)
+
+def has_from_directive(modelfile_content):
+    """Modelfile的第一个非空、非注释行是否为FROM指令（允许前导注释，如ollama show生成的说明）"""
+    first_line = _FIRST_NONCOMMENT_RE.search(modelfile_content or "")
+    return bool(first_line and first_line.group(1).upper().startswith('FROM '))
+
+def iter_ndjson(response, chunk_size=8192):
+    """逐条解析流式响应中的NDJSON记录，只缓存尚未解析完的部分"""
+    response.encoding = 'utf-8'
+    decoder = json.JSONDecoder()
+    buffer = ""
+    for chunk in response.iter_content(chunk_size=chunk_size, decode_unicode=True):
+        buffer += chunk
+        while buffer:
+            buffer = buffer.lstrip()
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break  # 记录不完整，等待更多数据
+            buffer = buffer[end:]
+            yield record
 
 def ensure_utf8_encoding(text):
     """确保文本是UTF-8编码"""
@@ -15,9 +51,12 @@ def ensure_utf8_encoding(text):
     
     # 如果已经是utf-8字符串，直接返回
     if isinstance(text, str):
+        # 纯ASCII文本不可能是乱码（isascii只检查字符串对象上的标志位）
+        if text.isascii():
+            return text
         try:
-            # 尝试检测是否有乱码
-            if any(ord(c) > 0xFFFF for c in text):
+            # 尝试检测是否有乱码（max在C层面比较，避免逐字符调用ord）
+            if max(text) > '\uffff':
                 # 可能有Unicode编码问题，尝试修复
                 bytes_data = text.encode('latin1')
                 return bytes_data.decode('utf-8')
@@ -48,13 +87,43 @@ class OllamaAPI:
     def __init__(self, base_url="http://localhost:11434"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        # 复用同一个会话，与Ollama服务之间保持长连接
+        # 界面会在线程池中并发请求，连接池要能容纳多个同时使用的连接；本机服务不做重试
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+        
+        # 简单的TTL缓存: 模型列表和各模型的Modelfile，值为(写入时间, 结果)
+        self._models_cache = None
+        self._modelfile_cache = {}
+        # 连接状态只缓存很短时间，用于合并短时间内的重复检查
+        self._connection_cache = None
+    
+    def invalidate_cache(self, model_name=None):
+        """清除缓存
+        
+        参数:
+            model_name: 指定时只清除模型列表和该模型的Modelfile缓存，否则全部清除
+        """
+        self._models_cache = None
+        if model_name is None:
+            self._modelfile_cache.clear()
+        else:
+            self._modelfile_cache.pop(model_name, None)
     
     def list_models(self):
         """获取所有已安装的模型列表"""
+        cached = self._models_cache
+        if cached and time.monotonic() - cached[0] < MODEL_LIST_TTL:
+            return cached[1]
+        
         try:
-            response = requests.get(f"{self.api_url}/tags", timeout=3)
+            response = self.session.get(f"{self.api_url}/tags", timeout=3)
             if response.status_code == 200:
-                return response.json().get('models', [])
+                models = response.json().get('models', [])
+                self._models_cache = (time.monotonic(), models)
+                return models
             else:
                 return []
         except (ConnectionError, Timeout) as e:
@@ -64,10 +133,20 @@ class OllamaAPI:
             print(f"获取模型列表失败: {e}")
             return []
     
+    @staticmethod
+    def _normalize_model_name(name):
+        """补全省略的标签，如 llama2 → llama2:latest"""
+        return name if ':' in name else f"{name}:latest"
+    
+    def _model_exists(self, model_name):
+        """通过/api/tags判断模型是否已安装"""
+        name = self._normalize_model_name(model_name)
+        return any(self._normalize_model_name(m.get('name', '')) == name for m in self.list_models())
+    
     def get_model_info(self, model_name):
         """获取特定模型的详细信息"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/show", 
                 json={"name": model_name},
                 timeout=3
@@ -83,154 +162,191 @@ class OllamaAPI:
             print(f"获取模型信息失败: {e}")
             return None
     
+    def get_model_infos(self, model_names):
+        """并行获取多个模型的详细信息
+        
+        返回:
+            {模型名称: 详细信息}，获取失败的模型对应None
+        """
+        if not model_names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(MODEL_INFO_WORKERS, len(model_names))) as executor:
+            return dict(zip(model_names, executor.map(self.get_model_info, model_names)))
+    
     def delete_model(self, model_name):
         """删除一个模型"""
         try:
-            response = requests.delete(
+            response = self.session.delete(
                 f"{self.api_url}/delete", 
                 json={"name": model_name}
             )
-            return response.status_code == 200
+            if response.status_code == 200:
+                # 模型列表已变化
+                self.invalidate_cache(model_name)
+                return True
+            return False
         except Exception as e:
             print(f"删除模型失败: {e}")
             return False
     
-    def pull_model(self, model_name):
-        """下载一个模型"""
+    def pull_model(self, model_name, progress_callback=None, should_stop=None):
+        """下载一个模型（流式读取进度，会一直阻塞到下载结束，应在工作线程中调用）
+        
+        参数:
+            progress_callback: 可选，每收到一条进度时调用progress_callback(已完成字节, 总字节, 状态)
+            should_stop: 可选，返回True时中止下载
+        """
         try:
-            response = requests.post(
+            with self.session.post(
                 f"{self.api_url}/pull", 
-                json={"name": model_name}
-            )
-            return response.status_code == 200
+                json={"name": model_name},
+                stream=True,
+                timeout=(3, None)
+            ) as response:
+                if response.status_code != 200:
+                    return False
+                
+                for progress in iter_ndjson(response):
+                    if should_stop and should_stop():
+                        print(f"已取消下载模型 {model_name}")
+                        return False
+                    
+                    if 'error' in progress:
+                        print(f"拉取模型失败: {progress['error']}")
+                        return False
+                    if progress_callback:
+                        progress_callback(progress.get('completed', 0), progress.get('total', 0),
+                                          progress.get('status', ''))
+            
+            # 模型列表已变化
+            self.invalidate_cache(model_name)
+            return True
         except Exception as e:
             print(f"拉取模型失败: {e}")
             return False
     
+    @staticmethod
+    def _modelfile_path(model_name):
+        """返回模型固定使用的临时Modelfile路径，同一模型每次创建都覆盖写入同一个文件"""
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', model_name)
+        return os.path.join(tempfile.gettempdir(), f"ollama_{safe_name}.modelfile")
+    
+    @staticmethod
+    def _run_ollama(*args):
+        """直接执行ollama命令（不经过shell解析），返回subprocess.CompletedProcess"""
+        return subprocess.run(["ollama", *args], encoding='utf-8', capture_output=True,
+                              creationflags=_NO_WINDOW)
+    
+    def _replace_model_via_temp(self, model_name, modelfile_path):
+        """兼容旧版Ollama：先用临时名称创建，再删除原模型并复制为原名称"""
+        # 创建一个临时名称
+        temp_model_name = f"{model_name}_temp_{int(time.time())}"
+        
+        # 首先使用临时名称创建新模型
+        result1 = self._run_ollama("create", temp_model_name, "-f", modelfile_path)
+        
+        if result1.returncode != 0:
+            print(f"创建临时模型失败: {result1.stderr}")
+            return False
+        
+        # 删除原模型
+        self._run_ollama("rm", model_name)
+        
+        # 重命名临时模型（cp只复制清单，模型数据层是共享的）
+        result3 = self._run_ollama("cp", temp_model_name, model_name)
+        
+        # 删除临时模型
+        self._run_ollama("rm", temp_model_name)
+        
+        return result3.returncode == 0
+    
     def create_model(self, model_name, modelfile_content):
         """使用Modelfile创建一个新模型"""
-        temp_file = None
         try:
             # 确保modelfile_content内容有效
-            if not modelfile_content or not modelfile_content.strip().startswith("FROM"):
+            if not has_from_directive(modelfile_content):
                 print("无效的Modelfile内容，必须包含FROM指令")
                 return False
             
-            # 创建临时Modelfile，明确指定编码为UTF-8
-            with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', delete=False, suffix='.modelfile') as f:
-                f.write(modelfile_content)
-                modelfile_path = f.name
-                temp_file = f.name
-            
-            # 先检查模型是否已存在，如果存在则先备份
-            existing_model = False
-            try:
-                result = subprocess.run(f'ollama list | findstr "{model_name}"', shell=True, capture_output=True, text=True)
-                existing_model = model_name in result.stdout
-            except:
-                pass
+            # 写入临时Modelfile，明确指定编码为UTF-8，一次写入整个内容
+            # ollama create只能从文件读取Modelfile，不支持标准输入
+            data = modelfile_content.encode('utf-8')
+            modelfile_path = self._modelfile_path(model_name)
+            with open(modelfile_path, 'wb', buffering=max(len(data), 65536)) as f:
+                f.write(data)
             
+            # 先检查模型是否已存在
+            existing_model = self._model_exists(model_name)
             if existing_model:
-                # 对于已存在的模型，使用不同的方法修改
                 print(f"模型 {model_name} 已存在，进行修改")
-                
-                if sys.platform == 'win32':
-                    # 创建一个临时名称
-                    temp_model_name = f"{model_name}_temp_{int(time.time())}"
-                    
-                    # 首先使用临时名称创建新模型
-                    cmd1 = f'ollama create {temp_model_name} -f "{modelfile_path}"'
-                    result1 = subprocess.run(cmd1, shell=True, encoding='utf-8', capture_output=True)
-                    
-                    if result1.returncode != 0:
-                        print(f"创建临时模型失败: {result1.stderr}")
-                        return False
-                    
-                    # 删除原模型
-                    cmd2 = f'ollama rm {model_name}'
-                    result2 = subprocess.run(cmd2, shell=True, encoding='utf-8', capture_output=True)
-                    
-                    # 重命名临时模型
-                    cmd3 = f'ollama cp {temp_model_name} {model_name}'
-                    result3 = subprocess.run(cmd3, shell=True, encoding='utf-8', capture_output=True)
-                    
-                    # 删除临时模型
-                    cmd4 = f'ollama rm {temp_model_name}'
-                    subprocess.run(cmd4, shell=True, encoding='utf-8')
-                    
-                    success = result3.returncode == 0
-                else:
-                    # 非Windows系统
-                    cmd = f'ollama create {model_name} -f "{modelfile_path}"'
-                    result = subprocess.run(cmd, shell=True, encoding='utf-8', capture_output=True)
-                    success = result.returncode == 0
             else:
-                # 对于新模型，直接创建
                 print(f"创建新模型: {model_name}")
-                
-                if sys.platform == 'win32':
-                    cmd = f'ollama create {model_name} -f "{modelfile_path}"'
-                    result = subprocess.run(cmd, shell=True, encoding='utf-8', capture_output=True)
-                    
-                    if result.returncode != 0:
-                        print(f"创建模型失败: {result.stderr}")
-                    
-                    success = result.returncode == 0
-                else:
-                    # 其他系统使用系统命令
-                    result = os.system(f'ollama create {model_name} -f "{modelfile_path}"')
-                    success = result == 0
             
-            # 删除临时文件
-            if os.path.exists(modelfile_path):
-                try:
-                    os.unlink(modelfile_path)
-                except Exception as e:
-                    print(f"删除临时文件失败: {e}")
+            # 新版Ollama的create会直接覆盖同名模型
+            result = self._run_ollama("create", model_name, "-f", modelfile_path)
+            success = result.returncode == 0
+            if not success:
+                print(f"创建模型失败: {result.stderr}")
+                if existing_model and sys.platform == 'win32':
+                    print("直接覆盖模型失败，改用临时模型替换")
+                    success = self._replace_model_via_temp(model_name, modelfile_path)
             
             # 验证模型是否创建成功
             if success:
-                # 检查模型是否可用
-                verify_cmd = f'ollama list | findstr "{model_name}"'
-                verify_result = subprocess.run(verify_cmd, shell=True, capture_output=True, text=True)
-                if model_name not in verify_result.stdout:
+                # 检查模型是否可用，模型列表已变化，先清除缓存
+                self.invalidate_cache(model_name)
+                if not self._model_exists(model_name):
                     print(f"模型 {model_name} 创建失败，未出现在模型列表中")
                     success = False
             
             return success
         except Exception as e:
             print(f"创建模型失败: {e}")
-            # 确保清理临时文件
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
             return False
     
     def get_modelfile(self, model_name):
         """获取模型的Modelfile内容"""
+        cached = self._modelfile_cache.get(model_name)
+        if cached and time.monotonic() - cached[0] < MODELFILE_TTL:
+            return cached[1]
+        
         try:
             info = self.get_model_info(model_name)
             if info and 'modelfile' in info:
                 # 确保返回的内容是UTF-8编码
-                modelfile_content = info['modelfile']
-                return ensure_utf8_encoding(modelfile_content)
+                modelfile_content = ensure_utf8_encoding(info['modelfile'])
+                
+                # 超出容量时丢弃最早写入的条目
+                self._modelfile_cache.pop(model_name, None)
+                if len(self._modelfile_cache) >= MODELFILE_CACHE_SIZE:
+                    self._modelfile_cache.pop(next(iter(self._modelfile_cache)), None)
+                self._modelfile_cache[model_name] = (time.monotonic(), modelfile_content)
+                return modelfile_content
             return None
         except Exception as e:
             print(f"获取Modelfile失败: {e}")
             return None
     
-    def check_connection(self):
-        """检查与Ollama API的连接状态"""
+    def check_connection(self, use_cache=True):
+        """检查与Ollama API的连接状态
+        
+        参数:
+            use_cache: 为False时忽略短时缓存，总是实际请求一次（用于轮询等待服务启动）
+        """
+        cached = self._connection_cache
+        if use_cache and cached and time.monotonic() - cached[0] < CONNECTION_TTL:
+            return cached[1]
+        
         try:
-            response = requests.get(f"{self.api_url}/tags", timeout=2)
-            return response.status_code == 200
+            response = self.session.get(f"{self.api_url}/tags", timeout=2)
+            connected = response.status_code == 200
         except (ConnectionError, Timeout):
             # 可能是安全模式阻止了网络连接
-            return False
+            connected = False
         except:
-            return False
+            connected = False
+        self._connection_cache = (time.monotonic(), connected)
+        return connected
     
     @staticmethod
     def get_modelfile_template():
@@ -1,14 +1,64 @@
 import sys
-import os
+import subprocess
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QListWidget, 
-                             QListWidgetItem, QSplitter, QTextEdit, QMessageBox, 
+                             QListWidgetItem, QSplitter, QPlainTextEdit, QMessageBox, 
                              QInputDialog, QMenu, QStatusBar, QTabWidget, 
-                             QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
+                             QTableView, QHeaderView, QFileDialog, QProgressDialog)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QTimer, QAbstractTableModel, QModelIndex,
+                          QObject, QRunnable, QThreadPool, QSaveFile, QIODevice)
 from PyQt5.QtGui import QIcon, QFont, QTextCursor
 import webbrowser
-from ollama_api import OllamaAPI
+from collections import OrderedDict
+from ollama_api import OllamaAPI, has_from_directive
+
+# 模型详情和Modelfile缓存的最大条目数
+DETAILS_CACHE_SIZE = 32
+
+# 启动Ollama服务后轮询连接的间隔(毫秒)，先密后疏，总计约13秒
+CONNECTION_POLL_DELAYS = [200, 300, 500, 800, 1300, 2000, 2000, 2000, 2000, 2000]
+
+# Windows下后台运行ollama pull时不弹出控制台窗口
+_NO_WINDOW = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+
+# 单独显示（或不在表格中显示）的模型信息字段，其余字段逐项列出
+_SKIP_KEYS = frozenset({"name", "size", "modified", "modelfile"})
+
+# 文件大小单位，按1024递增
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+def _format_size(n):
+    """把字节数格式化为合适的单位，如 3.53 GB、274.30 MB"""
+    n = int(n or 0)
+    if n < 1024:
+        return f"{max(n, 0)} B"
+    # 由二进制位数直接确定单位，只需一次除法
+    k = min((n.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{n / (1 << (10 * k)):.2f} {_SIZE_UNITS[k]}"
+
+# Modelfile参数说明(富文本)
+_HELP_HTML = """
+<h3>Modelfile 常用参数说明</h3>
+
+<p><b>FROM</b> - 指定基础模型，例如：llama2, mistral, gemma</p>
+
+<p><b>PARAMETER</b> - 设置模型参数：</p>
+<ul>
+  <li><b>temperature</b> - 控制生成的随机性 (0.0-1.0)，越高越随机</li>
+  <li><b>top_p</b> - 控制生成多样性 (0.0-1.0)</li>
+  <li><b>top_k</b> - 控制每步考虑的最可能token数</li>
+  <li><b>stop</b> - 停止生成的token，如 "User:", "Human:"</li>
+  <li><b>num_ctx</b> - 模型上下文长度</li>
+</ul>
+
+<p><b>SYSTEM</b> - 系统提示，定义模型的行为和角色</p>
+
+<p><b>TEMPLATE</b> - 自定义提示模板格式</p>
+
+<p><b>ADAPTER</b> - 指定adapter文件(适用于LoRA等微调)</p>
+
+<p>更多详细说明请参考<a href='https://github.com/ollama/ollama/blob/main/docs/modelfile.md'>Ollama Modelfile官方文档</a></p>
+"""
 
 class ModelfileEditor(QWidget):
     """Modelfile编辑器组件"""
@@ -17,8 +67,9 @@ class ModelfileEditor(QWidget):
         self.layout = QVBoxLayout(self)
         
         # 编辑区域
-        self.editor = QTextEdit()
+        self.editor = QPlainTextEdit()
         self.editor.setFont(QFont("Courier", 10))
+        self.editor.setLineWrapMode(QPlainTextEdit.NoWrap)
         self.editor.setPlaceholderText("# 在此编辑Modelfile内容\n# 例如:\nFROM llama2\nPARAMETER temperature 0.7\nPARAMETER top_p 0.9\nPARAMETER stop \"User:\"\nSYSTEM 你是一个有用的AI助手。")
         
         # 工具栏
@@ -40,6 +91,9 @@ class ModelfileEditor(QWidget):
         # 初始内容
         self.original_content = ""
         
+        # 参数说明对话框，首次点击时创建
+        self._help_msg = None
+        
         # 连接信号
         self.help_button.clicked.connect(self.show_help)
         self.template_button.clicked.connect(self.insert_template)
@@ -47,7 +101,7 @@ class ModelfileEditor(QWidget):
     def set_content(self, content):
         """设置编辑器内容"""
         self.original_content = content
-        self.editor.setText(content)
+        self.editor.setPlainText(content)
     
     def get_content(self):
         """获取编辑器内容"""
@@ -55,37 +109,17 @@ class ModelfileEditor(QWidget):
     
     def reset(self):
         """重置为原始内容"""
-        self.editor.setText(self.original_content)
+        self.editor.setPlainText(self.original_content)
     
     def show_help(self):
         """显示Modelfile参数说明"""
-        help_text = """
-<h3>Modelfile 常用参数说明</h3>
-
-<p><b>FROM</b> - 指定基础模型，例如：llama2, mistral, gemma</p>
-
-<p><b>PARAMETER</b> - 设置模型参数：</p>
-<ul>
-  <li><b>temperature</b> - 控制生成的随机性 (0.0-1.0)，越高越随机</li>
-  <li><b>top_p</b> - 控制生成多样性 (0.0-1.0)</li>
-  <li><b>top_k</b> - 控制每步考虑的最可能token数</li>
-  <li><b>stop</b> - 停止生成的token，如 "User:", "Human:"</li>
-  <li><b>num_ctx</b> - 模型上下文长度</li>
-</ul>
-
-<p><b>SYSTEM</b> - 系统提示，定义模型的行为和角色</p>
-
-<p><b>TEMPLATE</b> - 自定义提示模板格式</p>
-
-<p><b>ADAPTER</b> - 指定adapter文件(适用于LoRA等微调)</p>
-
-<p>更多详细说明请参考<a href='https://github.com/ollama/ollama/blob/main/docs/modelfile.md'>Ollama Modelfile官方文档</a></p>
-"""
-        msg = QMessageBox()
-        msg.setWindowTitle("Modelfile 参数说明")
-        msg.setText(help_text)
-        msg.setTextFormat(Qt.RichText)
-        msg.exec_()
+        # 说明内容固定不变，对话框只创建一次
+        if self._help_msg is None:
+            self._help_msg = QMessageBox(self)
+            self._help_msg.setWindowTitle("Modelfile 参数说明")
+            self._help_msg.setTextFormat(Qt.RichText)
+            self._help_msg.setText(_HELP_HTML)
+        self._help_msg.exec_()
     
     def insert_template(self):
         """插入Modelfile模板"""
@@ -112,18 +146,51 @@ class ModelfileEditor(QWidget):
         template = template.replace("{{system_prompt}}", system_prompt)
         
         # 设置编辑器内容
-        self.editor.setText(template)
+        self.editor.setPlainText(template)
+
+class ModelInfoModel(QAbstractTableModel):
+    """模型信息表格的数据模型，保存(属性, 值)列表"""
+    HEADERS = ("属性", "值")
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self._rows[index.row()][index.column()]
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+    
+    def set_rows(self, rows):
+        """一次性替换全部行，只触发一次模型重置"""
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
 
 class ModelDetailsWidget(QWidget):
     """模型详情显示组件"""
+    # Modelfile编辑器的保存按钮被点击
+    save_requested = pyqtSignal()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.layout = QVBoxLayout(self)
         
         # 创建表格来显示模型信息
-        self.details_table = QTableWidget()
-        self.details_table.setColumnCount(2)
-        self.details_table.setHorizontalHeaderLabels(["属性", "值"])
+        self.details_table = QTableView()
+        self._model = ModelInfoModel(self)
+        self.details_table.setModel(self._model)
         self.details_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         
         # 创建选项卡
@@ -135,58 +202,223 @@ class ModelDetailsWidget(QWidget):
         self.info_layout = QVBoxLayout(self.info_tab)
         self.info_layout.addWidget(self.details_table)
         
-        # 设置Modelfile选项卡
+        # 设置Modelfile选项卡，编辑器在首次切换到该选项卡（或首次被访问）时才创建
         self.modelfile_layout = QVBoxLayout(self.modelfile_tab)
-        self.modelfile_editor = ModelfileEditor()
-        self.modelfile_layout.addWidget(self.modelfile_editor)
+        self._modelfile_editor = None
+        # 编辑器创建前收到的Modelfile内容
+        self._pending_modelfile = None
         
         # 添加选项卡
         self.tabs.addTab(self.info_tab, "模型信息")
         self.tabs.addTab(self.modelfile_tab, "Modelfile")
+        self.tabs.currentChanged.connect(self._ensure_modelfile_tab)
         
         self.layout.addWidget(self.tabs)
     
+    @property
+    def modelfile_editor(self):
+        """Modelfile编辑器，首次访问时创建"""
+        if self._modelfile_editor is None:
+            editor = ModelfileEditor()
+            editor.save_button.clicked.connect(self.save_requested)
+            editor.reset_button.clicked.connect(editor.reset)
+            self.modelfile_layout.addWidget(editor)
+            self._modelfile_editor = editor
+            
+            if self._pending_modelfile is not None:
+                editor.set_content(self._pending_modelfile)
+                self._pending_modelfile = None
+        return self._modelfile_editor
+    
+    def _ensure_modelfile_tab(self, index):
+        """切换到Modelfile选项卡时创建编辑器"""
+        if self.tabs.widget(index) is self.modelfile_tab:
+            self.modelfile_editor
+    
     def display_model_info(self, model_info):
         """显示模型信息"""
-        self.details_table.setRowCount(0)
-        
         if not model_info:
+            self._model.set_rows([])
             return
         
-        # 添加基本信息
-        self._add_table_row("名称", model_info.get("name", ""))
-        self._add_table_row("大小", f"{model_info.get('size', 0) / 1024 / 1024 / 1024:.2f} GB")
-        self._add_table_row("修改时间", model_info.get("modified", ""))
-        
-        # 添加其他可用信息
-        for key, value in model_info.items():
-            if key not in ["name", "size", "modified", "modelfile"]:
-                if isinstance(value, (dict, list)):
-                    self._add_table_row(key, str(value))
-                else:
-                    self._add_table_row(key, str(value))
+        # 基本信息 + 其他可用信息，先在Python中构建完整列表再一次性交给模型
+        rows = [
+            ("名称", model_info.get("name", "")),
+            ("大小", _format_size(model_info.get('size', 0))),
+            ("修改时间", model_info.get("modified", "")),
+        ] + [
+            (key, str(value)) for key, value in model_info.items()
+            if key not in _SKIP_KEYS
+        ]
+        
+        # 批量更新期间暂停重绘和排序，填充完成后只调整一次列宽
+        self.details_table.setUpdatesEnabled(False)
+        self.details_table.setSortingEnabled(False)
+        try:
+            self._model.set_rows(rows)
+            self.details_table.resizeColumnToContents(0)
+        finally:
+            self.details_table.setUpdatesEnabled(True)
         
         # 设置Modelfile内容
         if "modelfile" in model_info:
-            self.modelfile_editor.set_content(model_info["modelfile"])
-    
-    def _add_table_row(self, key, value):
-        """向表格添加一行"""
-        row = self.details_table.rowCount()
-        self.details_table.insertRow(row)
-        self.details_table.setItem(row, 0, QTableWidgetItem(key))
-        self.details_table.setItem(row, 1, QTableWidgetItem(value))
+            if self._modelfile_editor is None:
+                self._pending_modelfile = model_info["modelfile"]
+            else:
+                self._modelfile_editor.set_content(model_info["modelfile"])
+
+class ApiWorker(QThread):
+    """在后台线程中执行一次阻塞的API调用，结果通过result信号回到界面线程"""
+    result = pyqtSignal(object)
+    
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+    
+    def run(self):
+        """执行API调用"""
+        try:
+            value = self.fn(*self.args)
+        except Exception as e:
+            print(f"API调用出错: {e}")
+            value = None
+        self.result.emit(value)
+
+class CreateModelWorker(QThread):
+    """在后台线程中创建（或重构）模型，避免界面卡死"""
+    result = pyqtSignal(bool)  # 是否成功
+    
+    def __init__(self, api, model_name, modelfile_content):
+        super().__init__()
+        self.api = api
+        self.model_name = model_name
+        self.modelfile_content = modelfile_content
+    
+    def run(self):
+        """执行模型创建"""
+        try:
+            success = self.api.create_model(self.model_name, self.modelfile_content)
+        except Exception as e:
+            print(f"创建模型出错: {e}")
+            success = False
+        self.result.emit(bool(success))
+
+class PullWorker(QThread):
+    """在后台线程中运行ollama pull，逐行转发命令输出"""
+    progress = pyqtSignal(str)  # 一行下载进度
+    result = pyqtSignal(bool)  # 是否下载成功
+    
+    def __init__(self, model_name):
+        super().__init__()
+        self.model_name = model_name
+        self.proc = None
+    
+    def run(self):
+        """执行下载"""
+        try:
+            self.proc = subprocess.Popen(
+                ["ollama", "pull", self.model_name],
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding="utf-8", errors="replace", bufsize=1,
+                creationflags=_NO_WINDOW
+            )
+            # 进度条用\r刷新，文本模式下会被当作换行，每次刷新都是一行
+            for line in self.proc.stdout:
+                line = line.strip()
+                if line:
+                    self.progress.emit(line)
+            self.result.emit(self.proc.wait() == 0)
+        except Exception as e:
+            print(f"下载模型出错: {e}")
+            self.progress.emit(f"下载模型出错: {e}")
+            self.result.emit(False)
+    
+    def stop(self):
+        """终止下载进程"""
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+
+class ExportSignals(QObject):
+    """ExportJob的信号载体（QRunnable本身不能发射信号）"""
+    done = pyqtSignal(str)  # 错误信息，成功时为空字符串
+
+class ExportJob(QRunnable):
+    """在线程池中把Modelfile写入文件
+    
+    使用QSaveFile先写入临时文件再替换目标文件，写入失败时目标文件保持不变
+    """
+    def __init__(self, file_path, modelfile_content):
+        super().__init__()
+        self.file_path = file_path
+        self.modelfile_content = modelfile_content
+        self.signals = ExportSignals()
+    
+    def run(self):
+        """执行写入"""
+        save_file = QSaveFile(self.file_path)
+        if not save_file.open(QIODevice.WriteOnly):
+            self.signals.done.emit(save_file.errorString())
+            return
+        
+        data = self.modelfile_content.encode('utf-8')
+        if save_file.write(data) != len(data):
+            error = save_file.errorString()
+            save_file.cancelWriting()
+            self.signals.done.emit(error)
+        elif not save_file.commit():
+            self.signals.done.emit(save_file.errorString())
+        else:
+            self.signals.done.emit("")
 
 class OllamaManagerGUI(QMainWindow):
     """Ollama模型管理器主窗口"""
     def __init__(self):
         super().__init__()
         self.api = OllamaAPI()
+        
+        # 模型详情和Modelfile的LRU缓存，键为(模型名称, 修改时间)
+        self._info_cache = OrderedDict()
+        self._modelfile_cache = OrderedDict()
+        # 模型名称 -> 列表中记录的修改时间
+        self._model_modified = {}
+        # 列表中的模型名称，与model_list的行顺序一致
+        self._model_names = []
+        # 模型名称 -> 列表中的行号
+        self._row_by_name = {}
+        # 上次显示的模型列表的(名称, 修改时间, 大小)，用于判断列表是否变化
+        self._models_signature = ()
+        # 保存按钮的当前用途: ("edit", None)重构当前模型，("create", 基础模型)基于基础模型新建
+        self._save_mode = ("edit", None)
+        
+        # 运行中的后台线程，结束前必须保留引用
+        self._workers = set()
+        # 正在进行的下载和通过"启动Ollama服务"启动的进程
+        self._pull_worker = None
+        self._serve_process = None
+        # 进行中的导出任务的信号对象，任务结束前必须保留引用
+        self._export_signals = set()
+        
+        # 启动服务后轮询连接的定时器和当前轮询次数
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setSingleShot(True)
+        self._poll_timer.timeout.connect(self._poll_step)
+        self._poll_index = 0
+        
         self.setup_ui()
         
         # 初始化后检查连接并加载模型
         QTimer.singleShot(100, self.check_connection)
     
+    def closeEvent(self, event):
+        """关闭窗口时等待后台线程结束，避免线程对象在运行中被销毁"""
+        # 下载可能持续很久，先终止下载进程
+        if self._pull_worker is not None:
+            self._pull_worker.stop()
+        for worker in list(self._workers):
+            worker.wait()
+        super().closeEvent(event)
+    
     def setup_ui(self):
         """设置用户界面"""
         self.setWindowTitle("Ollama 模型管理器")
@@ -235,7 +467,7 @@ class OllamaManagerGUI(QMainWindow):
         main_layout.addWidget(splitter)
         
         # 连接信号和槽
-        self.refresh_button.clicked.connect(self.refresh_models)
+        self.refresh_button.clicked.connect(lambda: self.refresh_models(force=True))
         self.add_model_button.clicked.connect(self.create_new_model)
         self.pull_model_button.clicked.connect(self.pull_model)
         self.delete_model_button.clicked.connect(self.delete_selected_model)
@@ -244,10 +476,17 @@ class OllamaManagerGUI(QMainWindow):
         self.model_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.model_list.customContextMenuRequested.connect(self.show_context_menu)
         
-        # 连接Modelfile编辑器的保存按钮
-        self.details_widget.modelfile_editor.save_button.clicked.connect(self.save_modelfile)
-        self.details_widget.modelfile_editor.reset_button.clicked.connect(
-            self.details_widget.modelfile_editor.reset)
+        # 连接Modelfile编辑器的保存按钮（编辑器本身延迟创建）
+        self.details_widget.save_requested.connect(self._on_save_clicked)
+        
+        # 创建模型时显示的进度对话框（不确定进度），重复使用同一个实例
+        self._progress = QProgressDialog("", None, 0, 0, self)
+        self._progress.setWindowTitle("创建中")
+        self._progress.setWindowModality(Qt.WindowModal)
+        self._progress.setCancelButton(None)
+        self._progress.setMinimumDuration(300)
+        # 构造后QProgressDialog会在一段时间后自动显示，reset()取消自动显示
+        self._progress.reset()
     
     def check_connection(self):
         """检查与Ollama API的连接"""
@@ -264,29 +503,149 @@ class OllamaManagerGUI(QMainWindow):
                 "无法连接到Ollama服务。请确保Ollama已安装并正在运行，或点击\"启动Ollama服务\"按钮。"
             )
     
-    def refresh_models(self):
-        """刷新模型列表"""
-        self.model_list.clear()
-        models = self.api.list_models()
+    def _start_worker(self, worker, on_result):
+        """启动后台线程，结果信号连接到on_result"""
+        self._workers.add(worker)
+        worker.result.connect(on_result)
+        worker.finished.connect(lambda: self._release_worker(worker))
+        worker.start()
+    
+    def _release_worker(self, worker):
+        """线程结束后释放引用"""
+        worker.wait()
+        self._workers.discard(worker)
+    
+    def _cache_get(self, cache, model_name):
+        """按(模型名称, 修改时间)查找缓存，未命中返回None"""
+        key = (model_name, self._model_modified.get(model_name))
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        return None
+    
+    def _cache_put(self, cache, model_name, value):
+        """写入缓存，获取失败的结果不缓存，下次重新请求"""
+        if value:
+            cache[(model_name, self._model_modified.get(model_name))] = value
+            if len(cache) > DETAILS_CACHE_SIZE:
+                cache.popitem(last=False)
+    
+    def _cached_lookup(self, cache, model_name, fetch):
+        """查找缓存，未命中时调用fetch获取并写入缓存"""
+        value = self._cache_get(cache, model_name)
+        if value is None:
+            value = fetch(model_name)
+            self._cache_put(cache, model_name, value)
+        return value
+    
+    def get_model_info(self, model_name):
+        """获取模型详情（带缓存）"""
+        return self._cached_lookup(self._info_cache, model_name, self.api.get_model_info)
+    
+    def get_modelfile(self, model_name):
+        """获取模型的Modelfile（带缓存）"""
+        return self._cached_lookup(self._modelfile_cache, model_name, self.api.get_modelfile)
+    
+    def _invalidate_details(self, model_name=None):
+        """清除模型详情缓存
+        
+        参数:
+            model_name: 指定时只清除该模型的条目，否则清除已不在列表中或修改时间已变化的条目
+        """
+        for cache in (self._info_cache, self._modelfile_cache):
+            if model_name is None:
+                stale = [key for key in cache
+                         if key[0] not in self._model_modified
+                         or self._model_modified[key[0]] != key[1]]
+            else:
+                stale = [key for key in cache if key[0] == model_name]
+            for key in stale:
+                del cache[key]
+    
+    def refresh_models(self, select_name=None, force=False):
+        """在后台刷新模型列表
+        
+        参数:
+            select_name: 刷新完成后要选中并显示详情的模型名称
+            force: 为True时先清除API的模型列表缓存，从服务器重新获取
+        """
+        if force:
+            self.api.invalidate_cache()
+        self.statusBar.showMessage("正在刷新模型列表...")
+        self._start_worker(ApiWorker(self.api.list_models),
+                           lambda models: self._on_models_loaded(models, select_name))
+    
+    def _on_models_loaded(self, models, select_name=None):
+        """模型列表加载完成后更新界面"""
+        models = models or []
+        
+        # 列表没有变化（例如下载期间反复刷新）时不重建列表控件
+        # 用户触发的刷新和模型增删后的刷新都已清除API缓存，这里比较的是服务器的最新列表
+        signature = tuple((model.get("name"), model.get("modified"), model.get("size"))
+                          for model in models)
+        if models and signature == self._models_signature:
+            self.statusBar.showMessage(f"已加载 {len(models)} 个模型 (无变化)")
+            self._select_model(select_name)
+            return
+        self._models_signature = signature
+        
+        # 批量更新期间暂停重绘和信号，所有条目添加完后只重绘一次
+        self.model_list.setUpdatesEnabled(False)
+        self.model_list.blockSignals(True)
+        try:
+            self.model_list.clear()
+            for model in models:
+                item = QListWidgetItem(model.get("name", "未知"))
+                item.setData(Qt.UserRole, model)
+                self.model_list.addItem(item)
+        finally:
+            self.model_list.blockSignals(False)
+            self.model_list.setUpdatesEnabled(True)
+        self._model_names = [model.get("name", "未知") for model in models]
+        self._row_by_name = {name: row for row, name in enumerate(self._model_names)}
         
         if not models:
             self.statusBar.showMessage("未找到模型或无法连接到Ollama")
             return
         
-        for model in models:
-            item = QListWidgetItem(model.get("name", "未知"))
-            item.setData(Qt.UserRole, model)
-            self.model_list.addItem(item)
+        self._model_modified = {model.get("name", "未知"): model.get("modified") for model in models}
+        self._invalidate_details()
         
         self.statusBar.showMessage(f"已加载 {len(models)} 个模型")
+        self._select_model(select_name)
+    
+    def _select_model(self, model_name):
+        """选择指定的模型（例如新创建的模型）并显示详情"""
+        row = self._row_by_name.get(model_name)
+        if row is not None:
+            self.model_list.setCurrentRow(row)
+            self.show_model_details(self.model_list.item(row))
     
     def show_model_details(self, item):
         """显示选中模型的详细信息"""
-        model_name = item.text()
+        self._load_model_details(item.text())
+    
+    def _load_model_details(self, model_name):
+        """获取模型详情，缓存未命中时在后台请求"""
         self.statusBar.showMessage(f"加载模型 {model_name} 的详细信息...")
         
-        # 获取详细信息
-        model_info = self.api.get_model_info(model_name)
+        model_info = self._cache_get(self._info_cache, model_name)
+        if model_info is not None:
+            self._on_model_info_loaded(model_name, model_info)
+            return
+        
+        self._start_worker(ApiWorker(self.api.get_model_info, model_name),
+                           lambda info: self._on_model_info_loaded(model_name, info))
+    
+    def _on_model_info_loaded(self, model_name, model_info):
+        """模型详情加载完成后显示"""
+        self._cache_put(self._info_cache, model_name, model_info)
+        
+        # 用户已切换到其他模型时丢弃过期结果
+        current_item = self.model_list.currentItem()
+        if current_item and current_item.text() != model_name:
+            return
+        
         if model_info:
             self.details_widget.display_model_info(model_info)
             self.statusBar.showMessage(f"已加载模型 {model_name} 的详细信息")
@@ -296,7 +655,7 @@ class OllamaManagerGUI(QMainWindow):
     def create_new_model(self):
         """创建新模型"""
         # 获取所有可用模型作为基础模型
-        available_models = [self.model_list.item(i).text() for i in range(self.model_list.count())]
+        available_models = list(self._model_names)
         
         if not available_models:
             QMessageBox.warning(
@@ -320,7 +679,7 @@ class OllamaManagerGUI(QMainWindow):
             return
         
         # 第2步：获取基础模型的Modelfile
-        base_modelfile = self.api.get_modelfile(base_model)
+        base_modelfile = self.get_modelfile(base_model)
         if not base_modelfile:
             QMessageBox.warning(
                 self, 
@@ -346,10 +705,15 @@ class OllamaManagerGUI(QMainWindow):
         )
         
         # 第4步：保存按钮点击时要求用户输入新模型名称
-        self.details_widget.modelfile_editor.save_button.clicked.disconnect()
-        self.details_widget.modelfile_editor.save_button.clicked.connect(
-            lambda: self._ask_model_name_and_create(base_model)
-        )
+        self._save_mode = ("create", base_model)
+    
+    def _on_save_clicked(self):
+        """保存按钮：按当前用途新建模型或重构当前模型"""
+        mode, base_model = self._save_mode
+        if mode == "create":
+            self._ask_model_name_and_create(base_model)
+        else:
+            self.save_modelfile()
     
     def _ask_model_name_and_create(self, base_model):
         """询问新模型名称并创建模型"""
@@ -393,45 +757,40 @@ class OllamaManagerGUI(QMainWindow):
             QMessageBox.warning(self, "创建失败", "Modelfile内容不能为空")
             return
         
-        # 检查是否修改了FROM行，如果没有修改则提醒用户
-        first_line = modelfile_content.split('\n')[0] if modelfile_content else ""
+        # 第一个非空、非注释的行必须是FROM指令，否则不必发起耗时的创建请求
+        # 与OllamaAPI.create_model使用同一规则
+        if not has_from_directive(modelfile_content):
+            QMessageBox.warning(self, "创建失败", "Modelfile内容无效，必须以FROM指令开头")
+            return
+        
         self.statusBar.showMessage(f"正在创建模型 {model_name}...")
         
-        # 提示用户操作正在进行
-        progress_msg = QMessageBox(self)
-        progress_msg.setWindowTitle("创建中")
-        progress_msg.setText(f"正在创建模型 {model_name}，这可能需要一些时间...\n请耐心等待。")
-        progress_msg.setStandardButtons(QMessageBox.NoButton)
-        progress_msg.show()
+        # 提示用户操作正在进行，创建在后台线程中进行，界面保持响应
+        self._progress.setLabelText(f"正在创建模型 {model_name}，这可能需要一些时间...\n请耐心等待。")
+        self._progress.show()
         
-        # 处理事件，确保消息框显示
-        QApplication.processEvents()
+        # 创建期间禁止重复提交
+        self.details_widget.modelfile_editor.save_button.setEnabled(False)
         
-        success = False
-        try:
-            # 创建模型
-            success = self.api.create_model(model_name, modelfile_content)
-        finally:
-            # 无论如何都关闭进度提示
-            progress_msg.close()
-            # 再次处理事件，确保对话框被关闭
-            QApplication.processEvents()
+        # 在后台线程中创建模型
+        worker = CreateModelWorker(self.api, model_name, modelfile_content)
+        self._start_worker(worker, lambda success: self._on_create_finished(success, model_name))
+    
+    def _on_create_finished(self, success, model_name):
+        """模型创建完成后更新界面"""
+        # 无论如何都关闭进度提示
+        self._progress.hide()
+        self.details_widget.modelfile_editor.save_button.setEnabled(True)
         
         if success:
             self.statusBar.showMessage(f"模型 {model_name} 创建成功")
             QMessageBox.information(self, "创建成功", f"模型 {model_name} 已成功创建")
-            self.refresh_models()
             
             # 恢复保存按钮的原始功能
-            self.details_widget.modelfile_editor.save_button.clicked.disconnect()
-            self.details_widget.modelfile_editor.save_button.clicked.connect(self.save_modelfile)
+            self._save_mode = ("edit", None)
             
-            # 选择新创建的模型
-            for i in range(self.model_list.count()):
-                if self.model_list.item(i).text() == model_name:
-                    self.model_list.setCurrentRow(i)
-                    self.show_model_details(self.model_list.item(i))
-                    break
+            # 刷新列表并选择新创建的模型
+            self.refresh_models(select_name=model_name)
         else:
             self.statusBar.showMessage(f"模型 {model_name} 创建失败")
             QMessageBox.warning(self, "创建失败", f"无法创建模型 {model_name}")
@@ -443,6 +802,10 @@ class OllamaManagerGUI(QMainWindow):
         )
         
         if ok and model_name:
+            if self._pull_worker is not None:
+                QMessageBox.warning(self, "下载模型", "已有模型正在下载，请等待其完成")
+                return
+            
             self.statusBar.showMessage(f"正在下载模型 {model_name}...")
             
             # 提示用户下载可能需要一段时间
@@ -450,11 +813,26 @@ class OllamaManagerGUI(QMainWindow):
                 self,
                 "下载模型",
                 f"正在开始下载模型 {model_name}，这可能需要一些时间。\n"
-                f"Ollama将在后台下载。您可以稍后刷新列表查看下载状态。"
+                f"Ollama将在后台下载，下载进度会显示在状态栏中，完成后自动刷新列表。"
             )
             
-            # 使用系统命令执行下载
-            os.system(f'start cmd /k ollama pull {model_name}')
+            # 在后台线程中执行下载，输出逐行显示在状态栏
+            worker = PullWorker(model_name)
+            worker.progress.connect(self.statusBar.showMessage)
+            self._pull_worker = worker
+            self._start_worker(worker, lambda success: self._on_pull_finished(model_name, success))
+    
+    def _on_pull_finished(self, model_name, success):
+        """下载结束后刷新模型列表"""
+        self._pull_worker = None
+        if success:
+            # 下载通过命令行完成，API的模型列表缓存还不包含新模型
+            self.api.invalidate_cache(model_name)
+            self.statusBar.showMessage(f"模型 {model_name} 下载完成")
+            self.refresh_models(select_name=model_name)
+        else:
+            self.statusBar.showMessage(f"模型 {model_name} 下载失败")
+            QMessageBox.warning(self, "下载失败", f"无法下载模型 {model_name}")
     
     def delete_selected_model(self):
         """删除选中的模型"""
@@ -477,6 +855,7 @@ class OllamaManagerGUI(QMainWindow):
             success = self.api.delete_model(model_name)
             
             if success:
+                self._invalidate_details(model_name)
                 self.statusBar.showMessage(f"模型 {model_name} 已删除")
                 self.refresh_models()
             else:
@@ -503,19 +882,24 @@ class OllamaManagerGUI(QMainWindow):
         
         if reply == QMessageBox.Yes:
             self.statusBar.showMessage(f"正在重构模型 {model_name}...")
-            success = self.api.create_model(model_name, modelfile_content)
+            self.details_widget.modelfile_editor.save_button.setEnabled(False)
+            worker = CreateModelWorker(self.api, model_name, modelfile_content)
+            self._start_worker(worker, lambda success: self._on_modelfile_saved(success, model_name))
+    
+    def _on_modelfile_saved(self, success, model_name):
+        """模型重构完成后更新界面"""
+        self.details_widget.modelfile_editor.save_button.setEnabled(True)
+        
+        if success:
+            self._invalidate_details(model_name)
+            self.statusBar.showMessage(f"模型 {model_name} 重构成功")
+            QMessageBox.information(self, "重构成功", f"模型 {model_name} 已成功重构")
             
-            if success:
-                self.statusBar.showMessage(f"模型 {model_name} 重构成功")
-                QMessageBox.information(self, "重构成功", f"模型 {model_name} 已成功重构")
-                
-                # 刷新模型信息
-                model_info = self.api.get_model_info(model_name)
-                if model_info:
-                    self.details_widget.display_model_info(model_info)
-            else:
-                self.statusBar.showMessage(f"模型 {model_name} 重构失败")
-                QMessageBox.warning(self, "重构失败", f"无法重构模型 {model_name}")
+            # 刷新模型信息
+            self._load_model_details(model_name)
+        else:
+            self.statusBar.showMessage(f"模型 {model_name} 重构失败")
+            QMessageBox.warning(self, "重构失败", f"无法重构模型 {model_name}")
     
     def show_context_menu(self, position):
         """显示右键菜单"""
@@ -550,7 +934,7 @@ class OllamaManagerGUI(QMainWindow):
     
     def export_modelfile(self, model_name):
         """导出Modelfile到文件"""
-        modelfile_content = self.api.get_modelfile(model_name)
+        modelfile_content = self.get_modelfile(model_name)
         if not modelfile_content:
             QMessageBox.warning(self, "导出失败", f"无法获取模型 {model_name} 的Modelfile")
             return
@@ -563,37 +947,49 @@ class OllamaManagerGUI(QMainWindow):
         )
         
         if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modelfile_content)
-                self.statusBar.showMessage(f"已将Modelfile导出到 {file_path}")
-                QMessageBox.information(self, "导出成功", f"Modelfile已成功导出到\n{file_path}")
-            except Exception as e:
-                self.statusBar.showMessage(f"导出失败: {e}")
-                QMessageBox.warning(self, "导出失败", f"导出Modelfile时出错:\n{e}")
+            # 在线程池中写入文件，界面保持响应
+            self.statusBar.showMessage(f"正在导出Modelfile到 {file_path}...")
+            job = ExportJob(file_path, modelfile_content)
+            signals = job.signals
+            self._export_signals.add(signals)
+            signals.done.connect(lambda error: self._on_export_finished(signals, file_path, error))
+            QThreadPool.globalInstance().start(job)
+    
+    def _on_export_finished(self, signals, file_path, error):
+        """导出完成后提示用户"""
+        self._export_signals.discard(signals)
+        if not error:
+            self.statusBar.showMessage(f"已将Modelfile导出到 {file_path}")
+            QMessageBox.information(self, "导出成功", f"Modelfile已成功导出到\n{file_path}")
+        else:
+            self.statusBar.showMessage(f"导出失败: {error}")
+            QMessageBox.warning(self, "导出失败", f"导出Modelfile时出错:\n{error}")
     
     def start_ollama_service(self):
         """启动Ollama服务"""
         self.statusBar.showMessage("尝试启动Ollama服务...")
         
         try:
-            # 使用系统命令在新窗口中启动ollama serve
+            # 在新的控制台窗口中启动ollama serve，不等待其结束
             if sys.platform == 'win32':
-                os.system('start cmd /k ollama serve')
+                self._serve_process = subprocess.Popen(
+                    ["ollama", "serve"], creationflags=subprocess.CREATE_NEW_CONSOLE)
             else:
-                os.system('gnome-terminal -- bash -c "ollama serve; exec bash"')
+                self._serve_process = subprocess.Popen(
+                    ["gnome-terminal", "--", "bash", "-c", "ollama serve; exec bash"])
+            
+            # 轮询等待服务就绪，提示框显示期间轮询照常进行
+            self.start_ollama_button.setEnabled(False)
+            self._poll_index = 0
+            self._schedule_connection_poll()
             
-            # 给服务一些启动时间
             QMessageBox.information(
                 self,
                 "启动Ollama",
                 "正在启动Ollama服务，这可能需要几秒钟时间...\n"
-                "服务启动后，请点击'刷新'按钮重新连接。"
+                "服务就绪后会自动连接并刷新模型列表。"
             )
             
-            # 3秒后尝试重新连接
-            QTimer.singleShot(3000, self.check_connection)
-            
         except Exception as e:
             self.statusBar.showMessage(f"启动Ollama服务失败: {e}")
             QMessageBox.warning(
@@ -602,10 +998,39 @@ class OllamaManagerGUI(QMainWindow):
                 f"无法启动Ollama服务: {e}\n请确保Ollama已正确安装。"
             )
     
+    def _schedule_connection_poll(self):
+        """按当前轮询次数对应的间隔安排下一次连接检查"""
+        self._poll_timer.start(CONNECTION_POLL_DELAYS[self._poll_index])
+    
+    def _poll_step(self):
+        """在后台检查一次连接"""
+        self._start_worker(ApiWorker(self.api.check_connection, False), self._on_poll_result)
+    
+    def _on_poll_result(self, connected):
+        """连接成功时停止轮询，否则退避后重试，全部次数用完后提示用户"""
+        if connected:
+            self.statusBar.showMessage("已连接到Ollama服务")
+            # 服务刚启动，缓存中可能是服务停止前的列表
+            self.refresh_models(force=True)
+            return
+        
+        self._poll_index += 1
+        if self._poll_index < len(CONNECTION_POLL_DELAYS):
+            self._schedule_connection_poll()
+            return
+        
+        self.statusBar.showMessage("无法连接到Ollama服务", 5000)
+        self.start_ollama_button.setEnabled(True)
+        QMessageBox.warning(
+            self,
+            "连接错误",
+            "Ollama服务启动超时。请检查Ollama是否已正确安装，或稍后点击\"刷新\"按钮重试。"
+        )
+    
     def clone_model(self, base_model_name):
         """基于选中的模型创建新模型"""
         # 获取基础模型的Modelfile
-        base_modelfile = self.api.get_modelfile(base_model_name)
+        base_modelfile = self.get_modelfile(base_model_name)
         if not base_modelfile:
             QMessageBox.warning(
                 self, 
@@ -631,10 +1056,7 @@ class OllamaManagerGUI(QMainWindow):
         )
         
         # 保存按钮点击时要求用户输入新模型名称
-        self.details_widget.modelfile_editor.save_button.clicked.disconnect()
-        self.details_widget.modelfile_editor.save_button.clicked.connect(
-            lambda: self._ask_model_name_and_create(base_model_name)
-        )
+        self._save_mode = ("create", base_model_name)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)